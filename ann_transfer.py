@@ -1,9 +1,37 @@
 from pathlib import Path
+import argparse
 
-from pecha_preparation_components import TransferAnnotations
+from pecha_preparation_components import instrumentation, TransferAnnotations
+from pecha_preparation_components.tools import batch_transfer
 
-origin = Path('input/ann_transfer/chojuk segmented.txt')
-target = Path('input/ann_transfer/chojuk clean.txt')
 
-ta = TransferAnnotations(origin, target)
-result = ta.transfer_segmentation()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='transfer segmentation from segmented texts to clean texts')
+    parser.add_argument('--origin', type=Path, default=Path('input/ann_transfer/chojuk segmented.txt'))
+    parser.add_argument('--target', type=Path, default=Path('input/ann_transfer/chojuk clean.txt'))
+    parser.add_argument('--origin-root', type=Path, help='batch mode: folder of the segmented texts')
+    parser.add_argument('--target-root', type=Path, help='batch mode: folder of the clean texts')
+    parser.add_argument('--out-root', type=Path, default=Path('output'), help='batch mode: output folder')
+    parser.add_argument('--origin-token', default='segmented',
+                        help='batch mode: part of the segmented file names that is replaced by --target-token '
+                             'to find the clean file')
+    parser.add_argument('--target-token', default='clean')
+    parser.add_argument('--pattern', default='*.txt')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--chunk-size', type=int, help='transfer texts by chunks of about this many characters')
+    parser.add_argument('--report', type=Path, help='write a json report of the time spent in each stage')
+    parser.add_argument('--profile-dir', type=Path, help='dump cProfile stats of each stage in this folder')
+    args = parser.parse_args()
+    if args.report or args.profile_dir:
+        instrumentation.enable(profile_dir=args.profile_dir)
+
+    if args.origin_root:
+        batch_transfer(args.origin_root, args.target_root or args.origin_root, args.out_root,
+                       origin_token=args.origin_token, target_token=args.target_token, pattern=args.pattern,
+                       workers=args.workers, chunk_size=args.chunk_size)
+    else:
+        ta = TransferAnnotations(args.origin, args.target, chunk_size=args.chunk_size, workers=args.workers)
+        result = ta.transfer_segmentation()
+
+    if args.report or args.profile_dir:
+        instrumentation.save_report(args.report)
@@ -0,0 +1,56 @@
+"""
+times the annotation transfer of the whole texts against the chunked transfer, on input/ann_transfer/chojuk*.txt
+scaled up synthetically: the body of the texts is repeated, copy n getting the marker n after every "ཀྱི་" so that
+copies differ. the header of the segmented file ("source:", "direction:", title) is kept once, at the top.
+
+    python benchmarks/bench_ann_transfer.py [--scales 1 2 4 8] [--chunk-size 10000] [--workers 1]
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+import repo_path  # noqa: F401
+from pecha_preparation_components.tools.ann_transfer import TransferAnnotations
+
+ANNS = [
+    ['segmentation', '(\n)'],
+    ['chapters', r'(ch-[0-9]+ )']
+]
+
+
+def scale_text(text, scale):
+    start = text.find('ch-1 ')
+    head, body = (text[:start], text[start:]) if start != -1 else ('', text)
+    return head + ''.join(body.replace('ཀྱི་', f'ཀྱི་{n}') for n in range(scale))
+
+
+def timed_transfer(origin, target, **kwargs):
+    ta = TransferAnnotations(origin, target, **kwargs)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # antx is verbose
+        res = ta.transfer_anns(ANNS)
+    return time.perf_counter() - start, res
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--origin', type=Path, default=Path('input/ann_transfer/chojuk segmented.txt'))
+    parser.add_argument('--target', type=Path, default=Path('input/ann_transfer/chojuk clean.txt'))
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    origin, target = args.origin.read_text(), args.target.read_text()
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            o, t = Path(tmp) / 'origin.txt', Path(tmp) / 'target.txt'
+            o.write_text(scale_text(origin, scale))
+            t.write_text(scale_text(target, scale))
+            whole_time, whole = timed_transfer(o, t)
+            chunk_time, chunked = timed_transfer(o, t, chunk_size=args.chunk_size, workers=args.workers)
+            print(f'x{scale} ({len(whole):,} chars): whole {whole_time:.2f}s, chunked {chunk_time:.2f}s, '
+                  f'same output: {whole == chunked}')
@@ -0,0 +1,115 @@
+"""
+compares the previous catalog parsing, which walked the ontology entries, then exported it to yaml and parsed it
+back, with the single walk of walk_ontology(), on a generated catalog. also compares writing catalog.json from a
+string and streaming it.
+
+    python benchmarks/bench_catalog.py [--works N]
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+import yaml  # PyYaml package
+
+import repo_path  # noqa: F401
+from pecha_preparation_components.catalog_parser.catalog_index import CatalogIndex
+from pecha_preparation_components.catalog_parser.catalog_manager import walk_ontology
+from pecha_preparation_components.catalog_parser.third_party.leavedonto.leavedonto import LeavedOnto
+from synthetic import make_catalog
+
+
+def legacy_parse(lo):
+    # __parse_cat_file and parse_catalog as they were
+    entries = lo.ont.export_all_entries()
+    cats_data = defaultdict(dict)
+    legend = lo.ont.legend
+    index = CatalogIndex()
+    for cats, data in entries:
+        if 'Uncategorized' in cats:
+            for d in data:
+                if d[4]:
+                    index.add_uncategorized(d[4])
+            continue
+        path = tuple(c for c in cats if 'data' not in c)
+        for d in data:
+            if d[4]:
+                index.add_work(d[4], d[5], path)
+        for c in cats:
+            if c not in cats_data and 'data' not in c:
+                langs = [d[0] for d in data if d[0]]
+                elts = {}
+                for num, l in enumerate(langs):
+                    elts[l] = {legend[i]: data[num][i] for i in range(1, 4)}
+                cats_data[elts['bo']['cat_name']] = elts
+
+    struct = yaml.safe_load(lo.export_yaml_str())
+
+    def recursive_parse(to_parse, legend, path=()):
+        for k, v in to_parse.items():
+            if 'data' in k:
+                parsed = {k: {} for k in legend[1:4]}
+                for line in v:
+                    lang = line[0]
+                    if lang:
+                        for n, l in enumerate(line[:4]):
+                            if n >= 1:
+                                parsed[legend[n]][lang] = l
+                parsed['works'] = index.works_in(path)
+                to_parse[k] = parsed
+            elif k == 'Uncategorized':
+                continue
+            else:
+                recursive_parse(v, legend, path + (k,))
+
+    recursive_parse(struct['ont'], struct['legend'])
+    del struct['ont']['Uncategorized']
+    return index, cats_data, struct['ont']
+
+
+def write_string(catalog, out_file):
+    out_file.write_text(json.dumps(catalog, ensure_ascii=False, indent=4), encoding='utf-8')
+
+
+def write_stream(catalog, out_file):
+    with open(out_file, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, ensure_ascii=False, indent=4)
+
+
+def measure(func, *args):
+    # timed on a first run, the memory being traced on a second one as tracing slows it down
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--works', type=int, default=30000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cat_file = make_catalog(Path(tmp) / 'catalog.yaml', args.works, random.Random(0))
+        lo = LeavedOnto(cat_file)
+        print(f'{args.works} works in {cat_file.stat().st_size / 1024 / 1024:.1f} MB')
+
+        (old_index, old_meta, old_tree), old_time, old_peak = measure(legacy_parse, lo)
+        (index, meta, tree), new_time, new_peak = measure(walk_ontology, lo.ont)
+        print('same result:', old_tree == tree and old_meta == meta
+              and old_index.works == index.works and old_index.uncategorized == index.uncategorized)
+        print(f'entries + yaml round trip: {old_time:.2f}s, peak {old_peak / 1024 / 1024:.1f} MB')
+        print(f'single walk:               {new_time:.2f}s, peak {new_peak / 1024 / 1024:.1f} MB')
+
+        _, string_time, string_peak = measure(write_string, tree, Path(tmp) / 'string.json')
+        _, stream_time, stream_peak = measure(write_stream, tree, Path(tmp) / 'stream.json')
+        print(f'json.dumps + write: {string_time:.2f}s, peak {string_peak / 1024 / 1024:.1f} MB')
+        print(f'json.dump stream:   {stream_time:.2f}s, peak {stream_peak / 1024 / 1024:.1f} MB')
@@ -0,0 +1,87 @@
+"""
+compares the python-docx path of write_documents with the direct xml writer on the aligned kumarajiva works,
+checking that both give the same document parts.
+
+    python benchmarks/bench_docx_writer.py [--in-folder FOLDER] [--repeat N]
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+import repo_path  # noqa: F401
+from pecha_preparation_components.raw_input_parsers.parse_cbeta_xml_triplets import (align_triplet, parse_triplets,
+                                                                                     write_documents)
+
+
+def aligned_works(in_folder):
+    triplets, _ = parse_triplets(in_folder)
+    works = []
+    with redirect_stdout(StringIO()):
+        for work, parts in sorted(triplets.items()):
+            for h, p in parts.items():
+                if not p:
+                    continue
+                out = []
+                for s in sorted(p.keys()):
+                    out.extend(align_triplet(p[s])[1])
+                works.append((work, h, out))
+    return works
+
+
+def write_all(works, out_folder, fast):
+    files = []
+    for work, h, aligned in works:
+        files.extend(write_documents(out_folder / work, work, h, aligned, fast=fast))
+    return files
+
+
+def timed(works, out_folder, fast, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        files = write_all(works, out_folder, fast)
+    return (time.perf_counter() - start) / repeat, files
+
+
+def peak_memory(work, out_folder, fast):
+    tracemalloc.start()
+    write_all([work], out_folder, fast)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def same_parts(a, b):
+    with zipfile.ZipFile(a) as za, zipfile.ZipFile(b) as zb:
+        return sorted(za.namelist()) == sorted(zb.namelist()) and all(
+            za.read(n) == zb.read(n) for n in za.namelist())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--in-folder', type=Path, default=Path('input/input_raw/kumarajiva/Gold Standard'))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    works = aligned_works(args.in_folder)
+    lines = sum(len(a) for _, _, a in works)
+    notes = sum(zh.count('^') for _, _, a in works for _, zh in a)
+    print(f'{len(works)} works, {lines} aligned lines, ~{notes} footnotes, {args.repeat} runs')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docx_folder, fast_folder = Path(tmp) / 'python-docx', Path(tmp) / 'fast'
+        docx_time, docx_files = timed(works, docx_folder, False, args.repeat)
+        fast_time, fast_files = timed(works, fast_folder, True, args.repeat)
+        print(f'python-docx: {docx_time:.2f}s')
+        print(f'fast:        {fast_time:.2f}s ({docx_time / fast_time:.1f}x)')
+        same = all(same_parts(a, b) for a, b in zip(docx_files, fast_files))
+        print(f'identical document parts: {same}')
+
+        largest = max(works, key=lambda w: len(w[2]))
+        print(f'peak memory on {largest[0]} ({len(largest[2])} lines):')
+        print(f'python-docx: {peak_memory(largest, docx_folder, False) / 1024:.0f} KB')
+        print(f'fast:        {peak_memory(largest, fast_folder, True) / 1024:.0f} KB')
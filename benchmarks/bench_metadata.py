@@ -0,0 +1,69 @@
+"""
+compares copying the metadata template next to each text with recursive_copy_metadata() and writing prefilled
+metadata with generate_metadata(), as xlsx or csv, with and without threads, on trees of empty docx files laid out as
+parse_cbeta_xml_triplets() writes them.
+
+    python benchmarks/bench_metadata.py [--texts N ...] [--workers N ...]
+"""
+import argparse
+import io
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from openpyxl import Workbook
+
+import repo_path  # noqa: F401
+from pecha_preparation_components.tools import recursive_copy_metadata
+from pecha_preparation_components.tools.metadata_generator import METADATA_KEYS, generate_metadata
+
+
+def make_tree(folder, texts):
+    # 4 texts per work: bo and zh, traditional and simplified
+    for n in range(texts // 4):
+        work = folder / f'Toh{n:04}_kp{n:04}_大乘經{n}'
+        work.mkdir(parents=True)
+        for st in ['', 'simplified_']:
+            for lang in ['bo', 'zh']:
+                (work / f'{work.name}_{st}{lang}.docx').write_bytes(b'')
+    return folder
+
+
+def make_template(out_file):
+    wb = Workbook()
+    wb.active.title = 'root text'
+    wb.active.append([None, 'BO', 'EN', 'ZH'])
+    for key in METADATA_KEYS:
+        wb.active.append([key])
+    wb.save(out_file)
+    return out_file
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        written = func(*args, **kwargs)
+    return time.perf_counter() - start, len(written)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--texts', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = make_template(Path(tmp) / 'template.xlsx')
+        for texts in args.texts:
+            tree = make_tree(Path(tmp) / f'tree_{texts}', texts)
+            print(f'{texts} texts')
+            seconds, n = timed(recursive_copy_metadata, template, tree, force=True)
+            print(f'\t{"template copies":24} {seconds:7.2f}s {n / seconds:8.0f} files/s')
+            for fmt in ['xlsx', 'csv']:
+                for workers in args.workers:
+                    seconds, n = timed(generate_metadata, tree, fmt=fmt, force=True, workers=workers)
+                    print(f'\t{f"{fmt}, {workers} threads":24} {seconds:7.2f}s {n / seconds:8.0f} files/s')
+            # nothing to write when all the files are there
+            seconds, n = timed(generate_metadata, tree, fmt='xlsx')
+            print(f'\t{"xlsx, all existing":24} {seconds:7.2f}s ({n} written)')
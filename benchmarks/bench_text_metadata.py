@@ -0,0 +1,45 @@
+"""
+times parse_text_metadata on generated per-text metadata workbooks:
+full read/write loading (previous behaviour), read-only loading with a cold cache and with a warm cache.
+
+    python benchmarks/bench_text_metadata.py [--texts N]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+import repo_path  # noqa: F401
+from pecha_preparation_components.catalog_parser.catalog_manager import parse_text_metadata
+from synthetic import make_metadata
+
+
+def full_load(local_path):
+    # loading as done before: read/write mode and every cell copied through sheet.rows
+    for f in Path(local_path).glob('*.xlsx'):
+        wb = load_workbook(f)
+        for sheet in wb:
+            [[r.value for r in row] for row in sheet.rows]
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--texts', type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = make_metadata(Path(tmp) / 'metadata', args.texts)
+        cache = Path(tmp) / 'cache' / 'metadata.pickle'
+
+        print(f'{args.texts} metadata workbooks')
+        print(f'full load:       {timed(full_load, folder):.2f}s')
+        print(f'read-only, cold: {timed(parse_text_metadata, folder, cache_path=cache):.2f}s')
+        print(f'read-only, warm: {timed(parse_text_metadata, folder, cache_path=cache):.2f}s')
@@ -0,0 +1,67 @@
+"""
+validates a tree of generated pecha.org json files, as parse_cbeta_xml_triplets() exports them, with and without a
+process pool.
+
+    python benchmarks/bench_validator.py [--files N] [--segments N] [--workers N ...]
+"""
+import argparse
+import io
+import json
+import random
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import repo_path  # noqa: F401
+from pecha_preparation_components.raw_input_parsers.pecha_json import export_pecha_json
+from pecha_preparation_components.tools.pecha_json_validator import validate_tree
+from synthetic import bo_sentence, zh_sentence
+
+CATALOG = {
+    'མདོ།': {
+        'data': {'cat_name': {'bo': 'མདོ།', 'en': 'Sutra'}, 'description': {'bo': 'ཀ', 'en': 'd'},
+                 'short_description': {'bo': 'ཁ', 'en': 's'}, 'works': []},
+    },
+}
+
+
+def make_tree(folder, files, segments, rng):
+    # the works are all in the same category, one file in 50 has a missing segment
+    catalog = json.loads(json.dumps(CATALOG))
+    with redirect_stdout(io.StringIO()):
+        for n in range(files):
+            title = f'{bo_sentence(rng, 4)} {n}'
+            catalog['མདོ།']['data']['works'].append([title, f'uuid{n}'])
+            aligned = [[bo_sentence(rng), zh_sentence(rng, 1 if rng.random() < 0.05 else None)]
+                       for _ in range(segments)]
+            out_file = export_pecha_json(folder / f'work{n}' / f'work{n}_pecha.json', aligned, catalog, title,
+                                         f'經{n}')
+            if n % 50 == 0:
+                doc = json.loads(out_file.read_text(encoding='utf-8'))
+                doc['source']['books'][0]['content'][f'經{n}']['data'].pop()
+                out_file.write_text(json.dumps(doc, ensure_ascii=False), encoding='utf-8')
+    catalog_file = folder / 'catalog.json'
+    catalog_file.write_text(json.dumps(catalog, ensure_ascii=False), encoding='utf-8')
+    return catalog_file
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--segments', type=int, default=500, help='aligned lines per file')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tree = Path(tmp)
+        catalog_file = make_tree(tree, args.files, args.segments, random.Random(0))
+        size = sum(f.stat().st_size for f in tree.rglob('*_pecha.json'))
+        print(f'{args.files} files of {args.segments} segments, {size / 1024 / 1024:.0f} MB')
+        for workers in args.workers:
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                results = validate_tree(tree, catalog_file=catalog_file, workers=workers, quiet=True)
+            seconds = time.perf_counter() - start
+            invalid = len([r for r in results if r['errors']])
+            print(f'{workers} workers: {seconds:.2f}s, {len(results) / seconds:.0f} files/s, {invalid} invalid')
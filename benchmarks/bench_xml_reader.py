@@ -0,0 +1,101 @@
+"""
+compares the xml reader (iter_sentences / iter_links), reading the files whole with regular expressions, with the
+previous regex-based line scanning and with streaming the files through expat, as done for the larger ones.
+only the reading is timed, not building the LinkTable of parse_table().
+
+    python benchmarks/bench_xml_reader.py [--in-folder FOLDER] [--repeat N]
+"""
+import argparse
+import re
+import time
+import tracemalloc
+from pathlib import Path
+
+import repo_path  # noqa: F401
+from pecha_preparation_components.raw_input_parsers.xml_reader import (iter_links, iter_sentences, stream_links,
+                                                                       stream_sentences)
+
+
+def regex_parse_lang(in_file):
+    dump = in_file.read_text()
+    lines = dump.split('\n')
+    out = {}
+    for line in lines:
+        if '"/>' in line:
+            a = re.findall(r's id=\"([0-9\:]+)\"\/>', line)
+            a.append('')
+        else:
+            a = re.findall(r's id=\"([0-9\:]+)\">([^<]+)<\/s>', line)
+            a = a[0] if a else []
+        if a:
+            out[a[0]] = a[1]
+    return out
+
+
+def regex_parse_table(in_file):
+    dump = in_file.read_text()
+    a = re.findall(r"type='([0-9\-]+)' xtargets='([0-9\:]*?)\;([0-9\:]*?)' status", dump)
+    out = []
+    for i, j, k in a:
+        out.append({'type': i, 'zh': j, 'bo': k})
+    return out
+
+
+def read_lang(in_file):
+    return dict(iter_sentences(in_file))
+
+
+def read_table(in_file):
+    return list(iter_links(in_file))
+
+
+def stream_parse_lang(in_file):
+    return dict(stream_sentences(in_file))
+
+
+def stream_parse_table(in_file):
+    return list(stream_links(in_file))
+
+
+def is_table(f):
+    return f.name.count('.') == 3
+
+
+def run(files, lang_func, table_func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for f in files:
+            table_func(f) if is_table(f) else lang_func(f)
+    return time.perf_counter() - start
+
+
+def peak_memory(f, func):
+    tracemalloc.start()
+    func(f)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--in-folder', type=Path, default=Path('input/input_raw/kumarajiva'))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    files = sorted(args.in_folder.rglob('*.xml'))
+    size = sum(f.stat().st_size for f in files)
+    print(f'{len(files)} files, {size / 1024 / 1024:.1f} MB, {args.repeat} runs')
+
+    regex_time = run(files, regex_parse_lang, regex_parse_table, args.repeat)
+    reader_time = run(files, read_lang, read_table, args.repeat)
+    stream_time = run(files, stream_parse_lang, stream_parse_table, args.repeat)
+    print(f'line regex: {regex_time:.2f}s')
+    print(f'reader:     {reader_time:.2f}s ({regex_time / reader_time:.2f}x)')
+    print(f'streaming:  {stream_time:.2f}s ({regex_time / stream_time:.2f}x)')
+
+    largest = max((f for f in files if not is_table(f)), key=lambda f: f.stat().st_size)
+    print(f'peak memory on {largest.name} ({largest.stat().st_size / 1024:.0f} KB):')
+    print(f'line regex: {peak_memory(largest, regex_parse_lang) / 1024:.0f} KB')
+    print(f'reader:     {peak_memory(largest, read_lang) / 1024:.0f} KB')
+    print(f'streaming:  {peak_memory(largest, stream_parse_lang) / 1024:.0f} KB')
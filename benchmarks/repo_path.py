@@ -0,0 +1,10 @@
+"""
+puts the repository on sys.path, so that the benchmarks import pecha_preparation_components from it without it being
+installed. imported by each benchmark script before the package
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
@@ -0,0 +1,187 @@
+"""
+times the main steps of the pipeline on synthetic inputs (see synthetic.py) at several scales, to see how they grow
+with the size of the input and catch performance regressions. the results can be saved as json to compare runs.
+
+    python benchmarks/run_benchmarks.py [--scales 1 10 100] [--repeat N] [--only NAME ...] [--out FILE]
+"""
+import argparse
+import io
+import json
+import platform
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import repo_path  # noqa: F401
+from synthetic import generate
+
+
+def first_triplet(inputs):
+    work = sorted(p for p in inputs['corpus'].iterdir())[0]
+    files = sorted(work.glob('*.xml'))
+    return {'bo': next(f for f in files if f.name.endswith('.bo.xml')),
+            'zh': next(f for f in files if f.name.endswith('.zh.xml') and not f.name.endswith('.bo.zh.xml')),
+            'bo_zh': next(f for f in files if f.name.endswith('.bo.zh.xml'))}
+
+
+# each benchmark takes the generated inputs and a scratch folder, prepares what it needs, and returns the function
+# to time, along with the amount of work it does and its unit
+
+def bench_parse_lang(inputs, tmp):
+    from pecha_preparation_components.raw_input_parsers.parse_cbeta_xml_triplets import parse_lang
+    tri = first_triplet(inputs)
+    return lambda: parse_lang(tri['zh']), len(parse_lang(tri['zh'])), 'sentences'
+
+
+def bench_parse_table(inputs, tmp):
+    from pecha_preparation_components.raw_input_parsers.parse_cbeta_xml_triplets import parse_table
+    tri = first_triplet(inputs)
+    return lambda: parse_table(tri['bo_zh']), len(parse_table(tri['bo_zh'])), 'links'
+
+
+def bench_align_triplet(inputs, tmp):
+    from pecha_preparation_components.raw_input_parsers.parse_cbeta_xml_triplets import align_triplet
+    tri = first_triplet(inputs)
+
+    def run():
+        with redirect_stdout(io.StringIO()):
+            return align_triplet(tri)
+    return run, len(run()[1]), 'lines'
+
+
+def write_documents_bench(inputs, tmp, fast):
+    from pecha_preparation_components.raw_input_parsers.parse_cbeta_xml_triplets import (align_triplet,
+                                                                                         write_documents)
+    with redirect_stdout(io.StringIO()):
+        _, aligned = align_triplet(first_triplet(inputs))
+    return lambda: write_documents(tmp, 'work', 'trad', aligned, fast=fast), len(aligned), 'lines'
+
+
+def bench_write_documents(inputs, tmp):
+    return write_documents_bench(inputs, tmp, False)
+
+
+def bench_write_documents_fast(inputs, tmp):
+    return write_documents_bench(inputs, tmp, True)
+
+
+def bench_parse_cbeta_2_pecha(inputs, tmp):
+    from pecha_preparation_components.raw_input_parsers.parse_cbeta_xml_triplets import parse_lang
+    from pecha_preparation_components.raw_input_parsers.parse_footnotes import parse_cbeta_2_pecha
+    segments = list(parse_lang(first_triplet(inputs)['zh']).values())
+    return lambda: [parse_cbeta_2_pecha(s) for s in segments], len(segments), 'segments'
+
+
+def bench_parse_text_metadata(inputs, tmp):
+    from pecha_preparation_components.catalog_parser.catalog_manager import parse_text_metadata
+    folder = inputs['metadata']
+    return lambda: parse_text_metadata(folder), len(list(folder.glob('*.xlsx'))), 'files'
+
+
+def bench_catalog_manager(inputs, tmp):
+    from pecha_preparation_components.catalog_parser.catalog_manager import CatalogManager
+
+    def run():
+        cm = CatalogManager(inputs['catalog'], inputs['metadata'])
+        cm.parse_catalog()
+        return cm
+    return run, len(run().index.uuids), 'works'
+
+
+def bench_transfer_annotations(inputs, tmp, chunk_size=None):
+    from pecha_preparation_components.tools.ann_transfer import TransferAnnotations
+    origin, target = inputs['ann_transfer']
+
+    def run():
+        with redirect_stdout(io.StringIO()):  # antx is verbose
+            ta = TransferAnnotations(origin, target, chunk_size=chunk_size, out_file=tmp / 'transferred.txt')
+            return ta.transfer_segmentation()
+    return run, len(origin.read_text(encoding='utf-8')), 'chars'
+
+
+def bench_transfer_annotations_chunked(inputs, tmp):
+    return bench_transfer_annotations(inputs, tmp, chunk_size=20000)
+
+
+BENCHMARKS = {
+    'parse_lang': bench_parse_lang,
+    'parse_table': bench_parse_table,
+    'align_triplet': bench_align_triplet,
+    'write_documents': bench_write_documents,
+    'write_documents_fast': bench_write_documents_fast,
+    'parse_cbeta_2_pecha': bench_parse_cbeta_2_pecha,
+    'parse_text_metadata': bench_parse_text_metadata,
+    'CatalogManager': bench_catalog_manager,
+    'TransferAnnotations': bench_transfer_annotations,
+    'TransferAnnotations_chunked': bench_transfer_annotations_chunked,
+}
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_benchmarks(scales, repeat, names, seed=0):
+    # {name: {scale: {'seconds', 'units', 'unit'} or {'error'}}}
+    results = {name: {} for name in names}
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            start = time.perf_counter()
+            inputs = generate(tmp / 'inputs', scale, seed)
+            print(f'x{scale}: inputs generated in {time.perf_counter() - start:.1f}s')
+            for name in names:
+                scratch = tmp / 'scratch' / name
+                scratch.mkdir(parents=True)
+                try:
+                    func, units, unit = BENCHMARKS[name](inputs, scratch)
+                    seconds = best_time(func, repeat)
+                    results[name][scale] = {'seconds': seconds, 'units': units, 'unit': unit}
+                    print(f'\t{name:28} {seconds:9.4f}s  {units:>9} {unit:9} {units / seconds:12,.0f} {unit}/s')
+                except Exception as e:
+                    results[name][scale] = {'error': repr(e)}
+                    print(f'\t{name:28} failed: {e!r}')
+    return results
+
+
+def print_summary(results, scales):
+    # seconds per scale, and how much slower each scale is than the previous one
+    print()
+    print(f'{"":28}' + ''.join(f'{"x" + str(s):>11}' for s in scales) + '   growth')
+    for name, by_scale in results.items():
+        cells, growth, prev = [], [], None
+        for s in scales:
+            res = by_scale.get(s, {})
+            if 'seconds' in res:
+                cells.append(f'{res["seconds"]:10.4f}s')
+                if prev:
+                    growth.append(f'{res["seconds"] / prev:.1f}x')
+                prev = res['seconds']
+            else:
+                cells.append(f'{"failed":>11}')
+                prev = None
+        print(f'{name:28}' + ''.join(cells) + '   ' + ' '.join(growth))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=3, help='the best of this many runs is kept')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='benchmarks to run, all by default')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=Path, help='save the results as json')
+    args = parser.parse_args()
+
+    names = args.only or list(BENCHMARKS)
+    results = run_benchmarks(args.scales, args.repeat, names, args.seed)
+    print_summary(results, args.scales)
+    if args.out:
+        report = {'python': platform.python_version(), 'platform': platform.platform(), 'scales': args.scales,
+                  'repeat': args.repeat, 'results': results}
+        args.out.write_text(json.dumps(report, indent=4), encoding='utf-8')
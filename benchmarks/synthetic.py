@@ -0,0 +1,237 @@
+"""
+generates synthetic inputs for the benchmarks: CBETA-style xml triplets with footnotes, a leavedonto-style catalog,
+per-text metadata workbooks and segmented/clean text pairs for annotation transfer.
+the same seed always gives the same files.
+
+    python benchmarks/synthetic.py OUT_FOLDER [--scale N] [--seed N]
+"""
+import argparse
+import random
+from pathlib import Path
+from uuid import UUID
+
+import yaml  # PyYaml package
+from openpyxl import Workbook
+
+# sizes at scale 1
+BASE = {'sentences': 500, 'works': 4, 'texts': 5, 'catalog_works': 50, 'chars': 2000}
+
+BO_SYLLABLES = ['ཀ', 'བཀྲ', 'ཤིས', 'བདེ', 'ལེགས', 'སངས', 'རྒྱས', 'བྱང', 'ཆུབ', 'སེམས', 'དཔའ', 'ཆོས', 'ཀྱི',
+                'དང', 'ནི', 'པ', 'བ', 'མ', 'ཐམས', 'ཅད', 'མཁྱེན', 'ཤེས', 'རབ', 'ཕ', 'རོལ', 'ཏུ', 'ཕྱིན']
+ZH_CHARS = '如是我聞一時佛在舍衛國祇樹給孤獨園與大比丘眾千二百五十人俱菩薩摩訶薩般若波羅蜜多心經觀自在'
+# link types of the alignment files, by weight
+LINK_TYPES = [((1, 1), 85), ((2, 1), 5), ((1, 2), 5), ((0, 1), 3), ((1, 0), 2)]
+METADATA_KEYS = ['author', 'composition_date', 'source', 'presentation', 'usage_title', 'title_short',
+                 'title_long_clean', 'title_alt_1', 'title_alt_2', 'is_commentary_of', 'is_version_of',
+                 'is_translation_of', 'lang']
+CATALOG_LEGEND = ['lang', 'cat_name', 'description', 'short_description', 'work', 'uuid']
+
+
+def bo_sentence(rng, syllables=None):
+    syllables = syllables or rng.randint(4, 20)
+    return '་'.join(rng.choice(BO_SYLLABLES) for _ in range(syllables)) + '།'
+
+
+def zh_sentence(rng, footnote=None):
+    text = ''.join(rng.choice(ZH_CHARS) for _ in range(rng.randint(4, 20)))
+    if footnote:
+        cut = rng.randint(1, len(text))
+        note = ''.join(rng.choice(ZH_CHARS) for _ in range(rng.randint(5, 40)))
+        text = f'{text[:cut]}^{footnote}[{note}]{text[cut:]}'
+    return text + '。'
+
+
+def sentence_ids(count, rng):
+    # ids in the "<paragraph>:<sentence>" form, paragraphs of 1 to 6 sentences
+    ids = []
+    par, num, size = 1, 0, rng.randint(1, 6)
+    for _ in range(count):
+        if num == size:
+            par, num, size = par + 1, 0, rng.randint(1, 6)
+        num += 1
+        ids.append(f'{par}:{num}')
+    return ids
+
+
+def write_sentences(out_file, ids, sentences):
+    lines = ["<?xml version='1.0' encoding='utf-8'?>", '<text>']
+    cur_par = None
+    for s_id, text in zip(ids, sentences):
+        par = s_id.split(':')[0]
+        if par != cur_par:
+            if cur_par is not None:
+                lines.append('  </p>')
+            lines.append(f'  <p id="{par}">')
+            cur_par = par
+        lines.append(f'    <s id="{s_id}">{text}</s>')
+    if cur_par is not None:
+        lines.append('  </p>')
+    lines.append('</text>')
+    out_file.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+def make_triplet(folder, name, sentences, rng, footnote_rate=0.05):
+    """
+    writes <name>.bo.xml, <name>.zh.xml and the <name>.bo.zh.xml alignment linking them, with about
+    sentences links. returns the paths as find_triplet() does
+    """
+    types, weights = zip(*LINK_TYPES)
+    links = rng.choices(types, weights, k=sentences)
+    n_zh, n_bo = sum(z for z, _ in links), sum(b for _, b in links)
+    zh_ids, bo_ids = sentence_ids(n_zh, rng), sentence_ids(n_bo, rng)
+
+    footnote = 0
+    zh = []
+    for _ in range(n_zh):
+        if rng.random() < footnote_rate:
+            footnote += 1
+            zh.append(zh_sentence(rng, footnote))
+        else:
+            zh.append(zh_sentence(rng))
+    bo = [bo_sentence(rng) for _ in range(n_bo)]
+
+    folder.mkdir(parents=True, exist_ok=True)
+    out = {'bo': folder / f'{name}.bo.xml', 'zh': folder / f'{name}.zh.xml', 'bo_zh': folder / f'{name}.bo.zh.xml'}
+    write_sentences(out['bo'], bo_ids, bo)
+    write_sentences(out['zh'], zh_ids, zh)
+
+    lines = ["<?xml version='1.0' encoding='utf-8'?>",
+             f"<linkGrp toDoc='{out['zh'].name}' fromDoc='{out['bo'].name}'>"]
+    z = b = 0
+    for n_z, n_b in links:
+        zh_side = ' '.join(zh_ids[z:z + n_z])
+        bo_side = ' '.join(bo_ids[b:b + n_b])
+        lines.append(f"<link type='{n_z}-{n_b}' xtargets='{zh_side};{bo_side}' status='man'/>")
+        z, b = z + n_z, b + n_b
+    lines.append('</linkGrp>')
+    out['bo_zh'].write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return out
+
+
+def make_corpus(folder, works, sentences, rng, simplified=True):
+    """
+    a folder of works as parse_triplets() expects them: one folder per work with its triplet, and the simplified
+    Chinese version in a "Modern Chinese" subfolder
+    """
+    for n in range(1, works + 1):
+        zh_title = ''.join(rng.choice(ZH_CHARS) for _ in range(6)) + '經'
+        work = folder / f'Toh{n:04}_kp{n:04}_{zh_title}'
+        name = f'synthetic-toh{n:04}-001'
+        make_triplet(work, name, sentences, rng)
+        if simplified:
+            make_triplet(work / 'Modern Chinese', name, sentences, rng)
+    return folder
+
+
+def make_metadata(folder, texts):
+    # per-text metadata workbooks, with a sheet for the root text and one for its commentary
+    folder.mkdir(parents=True, exist_ok=True)
+    for n in range(texts):
+        wb = Workbook()
+        for num, title in enumerate(['root text', 'commentary']):
+            sheet = wb.active if num == 0 else wb.create_sheet()
+            sheet.title = title
+            sheet.append([None, 'BO', 'EN', 'ZH'])
+            for key in METADATA_KEYS:
+                sheet.append([key, f'{key} {title} {n} བོད།', f'{key} {n}', f'{key} {n} 中文'])
+        wb.save(folder / f'text_{n:05}.xlsx')
+    return folder
+
+
+def make_catalog(out_file, works, rng, fanout=4, depth=3):
+    """
+    a leavedonto ontology of categories, fanout subcategories each on depth levels, holding works titles, written as
+    yaml. if leavedonto is installed, it is also converted to the xlsx the catalog is published as
+    """
+    def uuid():
+        return UUID(int=rng.getrandbits(128)).hex
+
+    def category(level, prefix):
+        name = f'{prefix}{rng.choice(BO_SYLLABLES)}་{level}།'
+        node = {'data': [
+            ['bo', name, f'{name} description', f'{name} short', '', ''],
+            ['en', f'category {prefix}{level}', f'description {prefix}{level}', f'short {prefix}{level}', '', ''],
+        ]}
+        nodes = [node]
+        if level < depth:
+            for i in range(fanout):
+                child, child_nodes = category(level + 1, f'{prefix}{i}')
+                node[child['data'][0][1]] = child
+                nodes.extend(child_nodes)
+        return node, nodes
+
+    ont, categories = {}, []
+    for i in range(fanout):
+        node, nodes = category(1, f'{i}')
+        ont[node['data'][0][1]] = node
+        categories.extend(nodes)
+    for n in range(works):
+        rows = rng.choice(categories)['data']
+        row = next((r for r in rows if not r[4]), None)
+        if row is None:
+            row = ['', '', '', '', '', '']
+            rows.append(row)
+        row[4], row[5] = f'{bo_sentence(rng, 6)} {n}', uuid()
+    ont['Uncategorized'] = [['', '', '', '', f'uncategorized {n}', uuid()] for n in range(works // 10)]
+
+    out_file = Path(out_file)
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    out_file.write_text(yaml.safe_dump({'legend': CATALOG_LEGEND, 'ont': ont}, allow_unicode=True,
+                                       sort_keys=False), encoding='utf-8')
+    try:
+        from pecha_preparation_components.catalog_parser.third_party.leavedonto.leavedonto import LeavedOnto
+    except ImportError:
+        return out_file
+    lo = LeavedOnto(out_file)
+    lo.convert2xlsx(out_file.parent)
+    return out_file.parent / f'{out_file.stem}.xlsx'
+
+
+def make_ann_pair(folder, name, chars, rng):
+    """
+    "<name> segmented.txt", one sentence per line with a "ch-<num> " marker every 50 lines, and
+    "<name> clean.txt", the same text on a single line with a few differences
+    """
+    lines, size = [], 0
+    while size < chars:
+        line = bo_sentence(rng)
+        if len(lines) % 50 == 0:
+            line = f'ch-{len(lines) // 50 + 1} {line}'
+        lines.append(line)
+        size += len(line) + 1
+    clean = []
+    for line in lines:
+        line = line.split(' ', 1)[1] if line.startswith('ch-') else line
+        if rng.random() < 0.02:
+            line = line.replace('་', ' ', 1)
+        clean.append(line)
+
+    folder.mkdir(parents=True, exist_ok=True)
+    segmented = folder / f'{name} segmented.txt'
+    segmented.write_text('\n'.join(lines), encoding='utf-8')
+    clean_file = folder / f'{name} clean.txt'
+    clean_file.write_text(' '.join(clean), encoding='utf-8')
+    return segmented, clean_file
+
+
+def generate(out_folder, scale=1, seed=0):
+    # all the inputs, at the given scale
+    rng = random.Random(seed)
+    out_folder = Path(out_folder)
+    return {
+        'corpus': make_corpus(out_folder / 'corpus', BASE['works'], BASE['sentences'] * scale, rng),
+        'metadata': make_metadata(out_folder / 'metadata', BASE['texts'] * scale),
+        'catalog': make_catalog(out_folder / 'catalog' / 'catalog.yaml', BASE['catalog_works'] * scale, rng),
+        'ann_transfer': make_ann_pair(out_folder / 'ann_transfer', 'synthetic', BASE['chars'] * scale, rng),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('out_folder', type=Path)
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for kind, path in generate(args.out_folder, args.scale, args.seed).items():
+        print(f'{kind}: {path}')
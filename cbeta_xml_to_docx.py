@@ -1,10 +1,48 @@
 from pathlib import Path
-import re
+import argparse
 
-from pecha_preparation_components import parse_cbeta_xml_triplets, recursive_copy_metadata
+from pecha_preparation_components import (instrumentation, generate_metadata, parse_cbeta_xml_triplets,
+                                         recursive_copy_metadata)
+from pecha_preparation_components.raw_input_parsers.pecha_json import load_titles
 
 
-in_folder = Path('input/input_raw/kumarajiva/Gold Standard')
-out_folder = Path('output')
-parse_cbeta_xml_triplets(in_folder, out_folder)
-recursive_copy_metadata(Path('input/metadata_template.xlsx'), Path('output/Gold Standard'))
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='export CBETA xml triplets to docx')
+    parser.add_argument('--in-folder', type=Path, default=Path('input/input_raw/kumarajiva/Gold Standard'))
+    parser.add_argument('--out-folder', type=Path, default=Path('output'))
+    parser.add_argument('--metadata-template', type=Path, default=Path('input/metadata_template.xlsx'))
+    parser.add_argument('--metadata-format', choices=['template', 'xlsx', 'csv'], default='template',
+                        help='copy the metadata template next to each text, or write metadata prefilled with what '
+                             'the folder names tell, as xlsx or csv')
+    parser.add_argument('--workers', type=int, default=1, help='number of works processed in parallel')
+    parser.add_argument('--force', action='store_true', help='rebuild all works and overwrite metadata files')
+    parser.add_argument('--catalog', type=Path, default=None,
+                        help='catalog.json from parse_catalog.py, to also export the works to pecha.org json')
+    parser.add_argument('--metadata', type=Path, default=None,
+                        help='folder of the text metadata giving the Tibetan titles of the works from their Toh '
+                             'numbers, the folder of the catalog by default')
+    parser.add_argument('--fast-docx', action='store_true',
+                        help='write the docx xml directly instead of going through python-docx')
+    parser.add_argument('--store', type=Path, default=None,
+                        help='also save the aligned segments in this SQLite database, see query_segments.py')
+    parser.add_argument('--report', type=Path, help='write a json report of the time spent in each stage')
+    parser.add_argument('--profile-dir', type=Path, help='dump cProfile stats of each stage in this folder')
+    parser.add_argument('--dry-run', action='store_true', help='only list the works that would be rebuilt')
+    args = parser.parse_args()
+    if args.report or args.profile_dir:
+        instrumentation.enable(profile_dir=args.profile_dir)
+
+    parse_cbeta_xml_triplets(args.in_folder, args.out_folder, workers=args.workers, force=args.force,
+                             dry_run=args.dry_run, catalog_file=args.catalog, fast_docx=args.fast_docx,
+                             store_file=args.store, metadata_path=args.metadata)
+    if not args.dry_run:
+        if args.metadata_format == 'template':
+            recursive_copy_metadata(args.metadata_template, args.out_folder / 'Gold Standard', force=args.force)
+        else:
+            # the Tibetan titles are filled in when the text metadata giving them is there
+            titles = load_titles(args.metadata or args.catalog.parent) if args.metadata or args.catalog else None
+            generate_metadata(args.out_folder / 'Gold Standard', fmt=args.metadata_format, force=args.force,
+                              titles=titles)
+
+    if args.report or args.profile_dir:
+        instrumentation.save_report(args.report)
@@ -1,6 +1,29 @@
+import argparse
+from pathlib import Path
+
+from pecha_preparation_components import instrumentation
 from pecha_preparation_components.catalog_parser import cat_parser
 
 cat_link = 'https://docs.google.com/spreadsheets/d/e/2PACX-1vTMygNIcWMvE-ifnrh5fdV3E789NiKPrLn-jdAmSuH70h1nWDjerDw77hxUd6QbVw/pub?output=xlsx'
 out_path = 'input/input_for_op_toolkit/catalog'
 
-cat_parser(cat_link, out_path)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='download and parse the catalog')
+    parser.add_argument('--cache-dir', help='where the downloaded catalog is kept between runs')
+    parser.add_argument('--offline', action='store_true', help='reuse the cached catalog without downloading it')
+    parser.add_argument('--force', action='store_true', help='parse the catalog even if it did not change')
+    parser.add_argument('--metadata-cache', type=Path,
+                        help='where the parsed text metadata is kept between runs, next to the cached catalog by '
+                             'default')
+    parser.add_argument('--no-metadata-cache', action='store_true', help='parse all the text metadata every time')
+    parser.add_argument('--report', type=Path, help='write a json report of the time spent in each stage')
+    parser.add_argument('--profile-dir', type=Path, help='dump cProfile stats of each stage in this folder')
+    args = parser.parse_args()
+    if args.report or args.profile_dir:
+        instrumentation.enable(profile_dir=args.profile_dir)
+
+    cat_parser(cat_link, out_path, cache_dir=args.cache_dir, offline=args.offline, force=args.force,
+               metadata_cache=False if args.no_metadata_cache else args.metadata_cache)
+
+    if args.report or args.profile_dir:
+        instrumentation.save_report(args.report)
@@ -1,3 +1,17 @@
-from .catalog_parser import cat_parser
-from .raw_input_parsers import parse_cbeta_2_pecha, parse_cbeta_xml_triplets
-from .tools import TransferAnnotations, copy_file, recursive_copy_metadata
+from ._lazy import install
+
+# the subpackages pull in openpyxl, PyYAML, urllib3, bayoo-docx, antx and leavedonto, so the public names are only
+# imported on first use: "from pecha_preparation_components import parse_cbeta_2_pecha" loads none of them
+__all__ = install(globals(), {
+    'cat_parser': '.catalog_parser',
+    'parse_cbeta_2_pecha': '.raw_input_parsers',
+    'parse_cbeta_2_pecha_batch': '.raw_input_parsers',
+    'parse_cbeta_xml_triplets': '.raw_input_parsers',
+    'export_pecha_json': '.raw_input_parsers',
+    'SegmentStore': '.raw_input_parsers',
+    'TransferAnnotations': '.tools',
+    'copy_file': '.tools',
+    'recursive_copy_metadata': '.tools',
+    'generate_metadata': '.tools',
+    'validate_tree': '.tools',
+})
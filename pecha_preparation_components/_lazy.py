@@ -0,0 +1,23 @@
+import importlib
+
+
+def install(namespace, lazy):
+    """
+    makes the names of lazy, {name: module relative to the package}, attributes of the package whose globals() are
+    namespace, only imported on first use. returns the names, for __all__
+    """
+    package = namespace['__name__']
+
+    def __getattr__(name):
+        if name not in lazy:
+            raise AttributeError(f'module {package!r} has no attribute {name!r}')
+        value = getattr(importlib.import_module(lazy[name], package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(namespace) | set(lazy))
+
+    namespace['__getattr__'] = __getattr__
+    namespace['__dir__'] = __dir__
+    return list(lazy)
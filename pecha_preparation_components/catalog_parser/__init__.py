@@ -1,7 +1,11 @@
-from .cat_parse import cat_parser
+from .._lazy import install
 
 # Dependencies of catalog_parser:
 # PyYAML
 # openpyxl
 # tibetan_sort
-# urllib3
\ No newline at end of file
+# urllib3
+# they are only imported on first use of cat_parser
+__all__ = install(globals(), {
+    'cat_parser': '.cat_parse',
+})
@@ -1,26 +1,37 @@
-import tempfile
-import urllib3
 import json
 from pathlib import Path
 
+from .. import instrumentation
 from .catalog_manager import CatalogManager
+from .downloader import CatalogCache, default_cache_dir
 
 
-def cat_parser(cat_link, out_path):
-    # B.1 download the catalog
-    http = urllib3.PoolManager()
-    r = http.request('GET', cat_link, preload_content=False)
-    tmp = tempfile.NamedTemporaryFile(mode='wb', suffix='.xlsx')
-    while True:
-        data = r.read(65536)
-        if not data:
-            break
-        tmp.write(data)
-    r.release_conn()
+def cat_parser(cat_link, out_path, cache_dir=None, offline=False, force=False, metadata_cache=None):
+    # metadata_cache: where the parsed text metadata is kept between runs, see MetadataCache. next to the downloaded
+    # catalog by default, not kept if False
+    # B.1 download the catalog, if it changed since last time
+    cache = CatalogCache(cache_dir if cache_dir else default_cache_dir(cat_link))
+    if metadata_cache is None:
+        metadata_cache = cache.cache_dir / 'metadata_cache.pickle'
+    with instrumentation.stage('catalog_download'):
+        cat_file = cache.fetch(cat_link, offline=offline)
+    instrumentation.count('catalog_bytes', Path(cat_file).stat().st_size)
 
-    # B.2 parse the catalog
-    cm = CatalogManager(tmp.name, out_path)
-    catalog = cm.parse_catalog()
-    cat_json = json.dumps(catalog, ensure_ascii=False, indent=4)
     out_file = Path(out_path) / 'catalog.json'
-    out_file.write_text(cat_json, encoding='utf-8')
+    if not force and out_file.is_file() and cache.meta.get('parsed_sha256') == cache.meta.get('sha256'):
+        print('catalog unchanged since last run, nothing to parse')
+        return False
+
+    # B.2 parse the catalog
+    with instrumentation.stage('catalog_parse'):
+        cm = CatalogManager(cat_file, out_path, cache_path=metadata_cache or None)
+        catalog = cm.parse_catalog()
+    instrumentation.count('catalog_works', len(cm.index.uuids))
+    with instrumentation.stage('catalog_writing'):
+        # written as it is encoded, without building the whole json string first
+        with open(out_file, 'w', encoding='utf-8') as f:
+            json.dump(catalog, f, ensure_ascii=False, indent=4)
+
+    cache.meta['parsed_sha256'] = cache.meta.get('sha256')
+    cache.save_meta()
+    return True
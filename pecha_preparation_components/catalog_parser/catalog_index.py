@@ -0,0 +1,38 @@
+from collections import defaultdict
+
+
+class CatalogIndex:
+    """
+    lookups over the works of a parsed catalog, built once:
+    title -> uuid, uuid -> category path, category -> works and the set of uncategorized titles.
+    a category path is the tuple of category names from the top of the catalog.
+    """
+    def __init__(self):
+        self.uuids = {}
+        self.paths = {}
+        self.works = defaultdict(list)
+        self.paths_by_name = defaultdict(list)
+        self.uncategorized = set()
+
+    def add_work(self, title, uuid, path):
+        path = tuple(path)
+        self.uuids.setdefault(title, uuid)
+        self.paths[uuid] = path
+        if path not in self.works:
+            self.paths_by_name[path[-1] if path else ''].append(path)
+        self.works[path].append((title, uuid))
+
+    def add_uncategorized(self, title):
+        self.uncategorized.add(title)
+
+    def find_work(self, title):
+        return self.uuids.get(title)
+
+    def category_path(self, uuid):
+        return list(self.paths.get(uuid, ()))
+
+    def works_in(self, category):
+        # category is either a full category path or a category name
+        if isinstance(category, str):
+            return [w for path in self.paths_by_name.get(category, []) for w in self.works[path]]
+        return list(self.works.get(tuple(category), []))
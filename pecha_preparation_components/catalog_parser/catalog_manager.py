@@ -1,21 +1,50 @@
+import json
+import os
 from pathlib import Path
 from collections import defaultdict
 
 from openpyxl import load_workbook
 from uuid import uuid4
-import yaml  # PyYaml package
 
+from .. import instrumentation
+from .catalog_index import CatalogIndex
+from .metadata_cache import MetadataCache
 from .third_party.leavedonto.leavedonto import LeavedOnto
 
 
-def parse_text_metadata(local_path):
-    #TODO: add sanity check to ensure that the minimal fields are filled.
-    current_texts = {}
-    local_path = Path(local_path)
-    for f in local_path.glob('*.xlsx'):
-        cur_root_text = ''
-        current = {}
-        wb = load_workbook(f)
+# empty rows read in a row before the rest of a sheet is taken as unused: spreadsheet apps can save thousands of
+# formatted empty rows at the bottom of a sheet
+MAX_EMPTY_ROWS = 100
+
+
+def read_sheet(sheet):
+    # values only, rows padded to the width of the header. reading stops after MAX_EMPTY_ROWS empty rows, trailing
+    # empty rows being dropped
+    if hasattr(sheet, 'reset_dimensions'):
+        # read-only sheets would otherwise be read up to the size claimed by the file, not the cells it has
+        sheet.reset_dimensions()
+    raw_data, empty = [], []
+    for row in sheet.iter_rows(values_only=True):
+        if all(v is None for v in row):
+            empty.append(list(row))
+            if len(empty) > MAX_EMPTY_ROWS:
+                break
+            continue
+        raw_data.extend(empty)
+        empty.clear()
+        raw_data.append(list(row))
+    width = len(raw_data[0]) if raw_data else 0
+    for row in raw_data:
+        if len(row) < width:
+            row.extend([None] * (width - len(row)))
+    return raw_data
+
+
+def parse_metadata_file(f):
+    cur_root_text = ''
+    current = {}
+    wb = load_workbook(f, read_only=True)
+    try:
         for sheet in wb:
             # find type: commentary or root text or independent
             if 'root' in sheet.title:
@@ -25,10 +54,9 @@ def parse_text_metadata(local_path):
             else:
                 type = 'independent'
             # read data
-            raw_data = []
-            for row in sheet.rows:
-                row = [r.value for r in row]
-                raw_data.append(row)
+            raw_data = read_sheet(sheet)
+            if not raw_data:
+                continue
             # parse data
             name = ''
             parsed = defaultdict(dict)
@@ -47,133 +75,210 @@ def parse_text_metadata(local_path):
             current[name] = parsed
             if type == 'root_text':
                 cur_root_text = name
-        # add root text name in commentary metadata
-        for name, meta in current.items():
-            if meta['other']['type'] == 'commentary':
-                meta['other']['root_text'] = cur_root_text
+    finally:
+        wb.close()
+    # add root text name in commentary metadata
+    for name, meta in current.items():
+        if meta['other']['type'] == 'commentary':
+            meta['other']['root_text'] = cur_root_text
+    return current
+
+
+@instrumentation.timed('text_metadata')
+def parse_text_metadata(local_path, cache_path=None):
+    #TODO: add sanity check to ensure that the minimal fields are filled.
+    cache = MetadataCache(cache_path) if cache_path else None
+    current_texts = {}
+    local_path = Path(local_path)
+    for f in local_path.glob('*.xlsx'):
+        current = cache.get(f) if cache else None
+        if current is None:
+            current = parse_metadata_file(f)
+            instrumentation.count('metadata_files_parsed')
+            if cache:
+                cache.put(f, current)
+        else:
+            instrumentation.count('metadata_files_cached')
         current_texts.update(current)
+    if cache:
+        cache.save()
     return current_texts
 
 
+def walk_ontology(ont):
+    """
+    a single walk of a leavedonto ontology (LeavedOnto.ont) giving:
+        - the CatalogIndex of its works
+        - the metadata of each category: {Tibetan category name: {lang: {legend field: value}}}
+        - the catalog tree: the categories nested as in the ontology, each "data" leaf being replaced by
+          {legend field: {lang: value}, ..., 'works': [(title, uuid), ...]}. Uncategorized is left out.
+    """
+    legend = ont.legend
+    index = CatalogIndex()
+    cats_meta = defaultdict(dict)
+    parsed_data = []
+
+    def leaves(node):
+        # the rows of all the leaves under node
+        if not node.children:
+            yield from node.data or []
+        for child in node.children.values():
+            yield from leaves(child)
+
+    def walk(node, path):
+        tree = {}
+        for key, child in node.children.items():
+            if key == 'Uncategorized':
+                for row in leaves(child):
+                    if row[4]:
+                        index.add_uncategorized(row[4])
+            elif 'data' in key:
+                rows = child.data or []
+                parsed = {f: {} for f in legend[1:4]}
+                for row in rows:
+                    if row[0]:
+                        for n in range(1, 4):
+                            parsed[legend[n]][row[0]] = row[n]
+                    if row[4]:
+                        index.add_work(row[4], row[5], path)
+                langs = [row[0] for row in rows if row[0]]
+                elts = {lang: {legend[i]: rows[num][i] for i in range(1, 4)} for num, lang in enumerate(langs)}
+                if elts and elts['bo']['cat_name'] not in cats_meta:
+                    cats_meta[elts['bo']['cat_name']] = elts
+                parsed_data.append((parsed, path))
+                tree[key] = parsed
+            else:
+                tree[key] = walk(child, path + (key,))
+        return tree
+
+    catalog = walk(ont.head, ())
+    # the works are only known once all the data of a category was seen
+    for parsed, path in parsed_data:
+        parsed['works'] = index.works_in(path)
+    return index, cats_meta, catalog
+
+
+def append_uncategorized(xlsx_file, legend, entries):
+    """
+    appends (title, uuid) entries to the "Uncategorized" sheet of the catalog workbook, leaving the other sheets as
+    they are. the workbook is saved to a temporary file that then replaces the catalog, so that an interrupted save
+    never leaves a broken catalog.
+    returns False, without writing anything, if there is no such sheet or its header does not have the title and
+    uuid columns of the legend.
+    """
+    xlsx_file = Path(xlsx_file)
+    if xlsx_file.suffix != '.xlsx' or not xlsx_file.is_file():
+        return False
+    wb = load_workbook(xlsx_file)
+    try:
+        if 'Uncategorized' not in wb.sheetnames:
+            return False
+        sheet = wb['Uncategorized']
+        header = [c.value for c in sheet[1]]
+        if legend[4] not in header or legend[5] not in header:
+            return False
+        title_col, uuid_col = header.index(legend[4]) + 1, header.index(legend[5]) + 1
+        # after the last row that has a value, so that formatted empty rows at the bottom are reused
+        last = max((c.row for row in sheet.iter_rows(min_row=2) for c in row if c.value not in (None, '')), default=1)
+        for num, (title, uuid) in enumerate(entries, start=last + 1):
+            sheet.cell(row=num, column=title_col, value=title)
+            sheet.cell(row=num, column=uuid_col, value=uuid)
+        tmp = xlsx_file.with_name(xlsx_file.name + '.tmp')
+        wb.save(tmp)
+    finally:
+        wb.close()
+    os.replace(tmp, xlsx_file)
+    return True
+
+
 class CatalogManager:
-    def __init__(self, cat_file, metadata_path):
+    def __init__(self, cat_file, metadata_path, cache_path=None):
         self.cat_file = Path(cat_file)
-        self.current_texts = parse_text_metadata(metadata_path)
-        self.works, self.uncategorized, self.onto = None, [], None
+        self.current_texts = parse_text_metadata(metadata_path, cache_path=cache_path)
+        self.works, self.uncategorized, self.onto, self.index, self.catalog = None, set(), None, None, None
+        self.last_report = None
         self.__parse_cat_file()
 
     def __parse_cat_file(self):
         lo = LeavedOnto(self.cat_file)
-        entries = lo.ont.export_all_entries()
-        cats_meta = self.__gather_cat_metadata(lo.ont, entries)
+        self.index, cats_meta, self.catalog = walk_ontology(lo.ont)
 
         # dict where: key = (text name, uuid), value = [{cat1}, {cat2}, ...]. ("{cat1}" comes from cats_data)
         works = {}
-        for cats, data in entries:
-            for d in data:
-                if d[4]:
-                    key = (d[4], d[5])
-                    value = []
-                    is_uncat = False
-                    for c in cats:
-                        if c == 'Uncategorized':
-                            is_uncat = True
-                        if 'data' not in c and c != 'Uncategorized':
-                            value.append(cats_meta[c])
-                    if is_uncat and key[0]:
-                        self.uncategorized.append(key[0])
-                    else:
-                        works[key] = value
+        for path, path_works in self.index.works.items():
+            value = [cats_meta[c] for c in path]
+            for key in path_works:
+                works[key] = value
         self.works = works
+        self.uncategorized = self.index.uncategorized
         self.onto = lo
 
-    @staticmethod
-    def __gather_cat_metadata(onto, entries):
-        # dict where: key = category name in tibetan, value = all the corresponding metadata
-        cats_data = defaultdict(dict)
-        legend = onto.legend
-        for cats, data in entries:
-            if 'Uncategorized' in cats:
-                continue
-            for c in cats:
-                if c not in cats_data and 'data' not in c:
-                    langs = [d[0] for d in data if d[0]]
-                    elts = {}
-                    for num, l in enumerate(langs):
-                        elt = {}
-                        for i in range(1, 4):
-                            elt[legend[i]] = data[num][i]
-                        elts[l] = elt
-                    cats_data[elts['bo']['cat_name']] = elts
-        return cats_data
+    def find_work(self, title):
+        return self.index.find_work(title)
+
+    def works_in(self, category):
+        return self.index.works_in(category)
+
+    def category_path(self, uuid):
+        return self.index.category_path(uuid)
 
     # extract text name,
     # generate uuid,
     # keep only those not in self.works
     # add (title, uuid) pairs to "unassigned" in onto,
-    # export onto as xlsx,
+    # append them to the Uncategorized sheet, or export onto as xlsx,
     # update catalog in Drive
-    def include_new_texts(self, local_path):
+    @instrumentation.timed('catalog_update')
+    def include_new_texts(self, local_path, report_file=None, full_export=False):
+        """
+        adds the texts of the metadata that are not yet in the catalog to Uncategorized.
+        the new rows are appended to the Uncategorized sheet of the catalog, the whole ontology being exported again
+        only if that is not possible or full_export is set.
+        self.last_report then holds what was done, also written as json to report_file if given:
+            {'new': [{'title', 'uuid'}], 'duplicates': [{'title', 'uuid', 'category'}],
+             'already_uncategorized': [title], 'saved': 'append' | 'export' | None}
+        duplicates are texts whose title is already given to a categorized work. if they are different texts,
+        one of them should be renamed.
+        """
+        report = {'new': [], 'duplicates': [], 'already_uncategorized': [], 'saved': None}
         # parse metadata of current texts
-        existing_texts = [w[0] for w in self.works.keys()]
         unassigned = []
         for cur, _ in self.current_texts.items():
-            if cur in existing_texts:
-                print('!!!text with same name exists. if it is different, please change the name!!!')
-                # todo: add this info to a report for Data Team to process.
-            elif cur in self.uncategorized:
-                continue
+            uuid = self.index.find_work(cur)
+            if uuid:
+                report['duplicates'].append({'title': cur, 'uuid': uuid, 'category': self.index.category_path(uuid)})
+            elif cur in self.index.uncategorized:
+                report['already_uncategorized'].append(cur)
             else:
                 entry = cur, uuid4().hex
                 unassigned.append(entry)
+                report['new'].append({'title': entry[0], 'uuid': entry[1]})
+                self.index.add_uncategorized(cur)
+        instrumentation.count('duplicate_titles', len(report['duplicates']))
+        if report['duplicates']:
+            print(f'!!!{len(report["duplicates"])} texts have the same name as a catalogued work. '
+                  f'if they are different, please change their name!!!')
 
         # add new texts to onto
+        instrumentation.count('new_texts', len(unassigned))
         for k, v in unassigned:
             self.onto.ont.head.children['Uncategorized'].data.append(['', '', '', '', k, v])
 
-        # export updated onto file if any unassigned texts found
+        # save the updated catalog if any unassigned texts found
         if unassigned:
-            if self.onto.ont_path.is_file():
-                self.onto.ont_path.unlink()
-            self.onto.convert2xlsx(self.onto.ont_path.parent)
-            return True
-        return False
+            if not full_export and append_uncategorized(self.onto.ont_path, self.onto.ont.legend, unassigned):
+                report['saved'] = 'append'
+            else:
+                if self.onto.ont_path.is_file():
+                    self.onto.ont_path.unlink()
+                self.onto.convert2xlsx(self.onto.ont_path.parent)
+                report['saved'] = 'export'
+
+        self.last_report = report
+        if report_file:
+            Path(report_file).write_text(json.dumps(report, ensure_ascii=False, indent=4), encoding='utf-8')
+        return bool(unassigned)
 
     def parse_catalog(self):
-        yaml_str = self.onto.export_yaml_str()
-        struct = yaml.safe_load(yaml_str)
-        parsed = self.__parse_cat_struct(struct)
-        return parsed
-
-    @staticmethod
-    def __parse_cat_struct(struct):
-        def recursive_parse(to_parse, legend):
-            for k, v in to_parse.items():
-                if 'data' in k:
-                    # parsing data
-                    parsed = {k: {} for k in legend[1:4]}
-                    parsed['works'] = []
-                    for line in v:
-                        lang = line[0]
-                        if lang:
-                            for n, l in enumerate(line[:4]):
-                                if n >= 1:
-                                    parsed[legend[n]][lang] = l
-                        if line[4]:
-                            parsed['works'].append((line[4], line[5]))
-                    # replace unparsed content with parsed
-                    to_parse[k] = parsed
-                elif k == 'Uncategorized':
-                    continue
-                else:
-                    recursive_parse(v, legend)
-
-        # actual parsing
-        recursive_parse(struct['ont'], struct['legend'])
-
-        # cleanup
-        del struct['legend']
-        del struct['ont']['Uncategorized']
-        struct = struct['ont']
-
-        return struct
+        # the catalog tree, built along with the index when the catalog file was parsed
+        return self.catalog
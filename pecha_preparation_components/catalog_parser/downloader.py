@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import urllib3
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CatalogDownloadError(Exception):
+    # the server refused the download (404, 403, ...): it is neither retried nor replaced by the cached catalog
+    def __init__(self, url, status):
+        super().__init__(f'{url} answered with status {status}')
+        self.url = url
+        self.status = status
+
+# shared by all downloads to reuse connections
+http = urllib3.PoolManager()
+
+
+def default_cache_dir(url):
+    key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+    return Path.home() / '.cache' / 'pecha_preparation_components' / key
+
+
+class CatalogCache:
+    """
+    keeps the last downloaded catalog with its ETag/Last-Modified headers so that only changed catalogs are
+    downloaded again. interrupted downloads are resumed from the partial file when the server allows it.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.file = self.cache_dir / 'catalog.xlsx'
+        self.part = self.cache_dir / 'catalog.xlsx.part'
+        self.meta_file = self.cache_dir / 'catalog_meta.json'
+        self.meta = {}
+        if self.meta_file.is_file():
+            self.meta = json.loads(self.meta_file.read_text(encoding='utf-8'))
+
+    def save_meta(self):
+        tmp = self.meta_file.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.meta, indent=4), encoding='utf-8')
+        os.replace(tmp, self.meta_file)
+
+    def fetch(self, url, offline=False, retries=3, backoff=1.0, timeout=60):
+        """
+        returns the path to an up-to-date copy of the catalog.
+        offline: reuse the cached copy without any request
+        network errors and RETRY_STATUSES are retried, the cached copy being used if they go on. other statuses raise
+        CatalogDownloadError at once
+        """
+        if offline:
+            if not self.file.is_file():
+                raise FileNotFoundError(f'no cached catalog in {self.cache_dir}')
+            return self.file
+
+        for attempt in range(retries + 1):
+            try:
+                if self.__download(url, timeout):
+                    return self.file
+            except (urllib3.exceptions.HTTPError, OSError) as e:
+                print(f'catalog download failed ({e}), attempt {attempt + 1}/{retries + 1}')
+            if attempt < retries:
+                time.sleep(backoff * 2 ** attempt)
+
+        if self.file.is_file():
+            print('using the cached catalog')
+            return self.file
+        raise ConnectionError(f'could not download {url}')
+
+    def __download(self, url, timeout):
+        headers = {}
+        if self.file.is_file() and self.meta.get('url') == url:
+            if self.meta.get('etag'):
+                headers['If-None-Match'] = self.meta['etag']
+            if self.meta.get('last_modified'):
+                headers['If-Modified-Since'] = self.meta['last_modified']
+        resume_from = self.part.stat().st_size if self.part.is_file() and self.meta.get('part_etag') else 0
+        if resume_from:
+            headers['Range'] = f'bytes={resume_from}-'
+            headers['If-Range'] = self.meta['part_etag']
+
+        r = http.request('GET', url, headers=headers, preload_content=False, retries=False, timeout=timeout)
+        try:
+            if r.status == 304:
+                return True
+            if r.status in RETRY_STATUSES:
+                return False
+            if r.status not in (200, 206):
+                raise CatalogDownloadError(url, r.status)
+
+            etag = r.headers.get('ETag')
+            mode = 'ab' if r.status == 206 else 'wb'
+            # the partial file can only be resumed if the server identifies the content
+            self.meta['part_etag'] = etag
+            self.save_meta()
+            with open(self.part, mode) as f:
+                while True:
+                    data = r.read(65536)
+                    if not data:
+                        break
+                    f.write(data)
+        finally:
+            r.release_conn()
+
+        os.replace(self.part, self.file)
+        self.meta.update({
+            'url': url,
+            'etag': etag,
+            'last_modified': r.headers.get('Last-Modified'),
+            'sha256': file_hash(self.file),
+            'part_etag': None,
+        })
+        self.save_meta()
+        return True
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1048576), b''):
+            h.update(chunk)
+    return h.hexdigest()
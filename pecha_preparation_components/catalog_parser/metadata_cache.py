@@ -0,0 +1,55 @@
+import os
+import pickle
+from collections import OrderedDict
+from pathlib import Path
+
+
+class MetadataCache:
+    """
+    parsed metadata workbooks pickled to disk, keyed by file path.
+    an entry is only reused if the file still has the same mtime and size,
+    and the least recently used entries are dropped once there are more than max_entries.
+    the cache is only saved when entries were added or dropped: the order of the hits alone is not worth rewriting it.
+    """
+    def __init__(self, path, max_entries=5000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.changed = False
+        if self.path.is_file():
+            try:
+                self.entries = pickle.loads(self.path.read_bytes())
+            except (pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+                # a corrupted cache is simply rebuilt
+                self.entries = OrderedDict()
+
+    @staticmethod
+    def __key(f):
+        f = Path(f)
+        stat = f.stat()
+        return str(f.resolve()), (stat.st_mtime_ns, stat.st_size)
+
+    def get(self, f):
+        key, stamp = self.__key(f)
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != stamp:
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, f, parsed):
+        key, stamp = self.__key(f)
+        self.entries[key] = (stamp, parsed)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_bytes(pickle.dumps(self.entries, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp, self.path)
+        self.changed = False
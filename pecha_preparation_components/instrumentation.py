@@ -0,0 +1,194 @@
+"""
+stage timers and counters for the preparation pipeline.
+
+everything is off by default: stage() then returns a shared no-op context manager and count() returns at once.
+scripts turn it on with enable() and write a json report with save_report():
+
+    {"wall_seconds": 12.3, "workers": 4, "tasks": 40,
+     "stages": {"alignment": {"calls": 40, "seconds": 3.2}, ...},
+     "counters": {"sentences": 123456, ...}}
+
+stages may be nested, a nested stage's time being also counted in the stage around it. stage times of work done in
+worker processes are merged into the parent's report, so they add up the time spent in all the workers and can
+exceed wall_seconds. "workers" is the number of worker processes that sent reports, "tasks" the number of reports.
+with a profile_dir, each outermost stage also runs under cProfile, and the stats are dumped to <stage>.prof files,
+<stage>.<pid>.<n>.prof for the ones collected in worker processes.
+"""
+import functools
+import itertools
+import json
+import os
+import time
+from collections import Counter
+from contextlib import nullcontext
+from pathlib import Path
+
+
+class Instrumentation:
+    def __init__(self):
+        self.enabled = False
+        self.profile_dir = None
+        self.reset()
+
+    def reset(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counters = Counter()
+        self.profiles = {}
+        self.depth = 0
+        self.worker_pids = set()
+        self.tasks = 0
+
+
+class Stage:
+    def __init__(self, name):
+        self.name = name
+        self.profile = None
+
+    def __enter__(self):
+        if _inst.profile_dir and not _inst.depth:
+            if self.name not in _inst.profiles:
+                import cProfile
+                _inst.profiles[self.name] = cProfile.Profile()
+            self.profile = _inst.profiles[self.name]
+            self.profile.enable()
+        _inst.depth += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        _inst.depth -= 1
+        if self.profile:
+            self.profile.disable()
+        stats = _inst.stages.setdefault(self.name, {'calls': 0, 'seconds': 0.0})
+        stats['calls'] += 1
+        stats['seconds'] += elapsed
+        return False
+
+
+_inst = Instrumentation()
+_null = nullcontext()
+_worker_tasks = itertools.count()
+
+
+def enable(profile_dir=None):
+    _inst.enabled = True
+    _inst.profile_dir = Path(profile_dir) if profile_dir else None
+    _inst.reset()
+
+
+def disable():
+    _inst.enabled = False
+    _inst.profile_dir = None
+    _inst.reset()
+
+
+def enabled():
+    return _inst.enabled
+
+
+def stage(name):
+    # with stage('alignment'): ...
+    if not _inst.enabled:
+        return _null
+    return Stage(name)
+
+
+def count(name, n=1):
+    if _inst.enabled:
+        _inst.counters[name] += n
+
+
+def timed(name):
+    # decorator version of stage()
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _inst.enabled:
+                return func(*args, **kwargs)
+            with Stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_iter(name, iterable):
+    # times the production of each item of a lazy iterable, leaving out the time its consumer takes
+    if not _inst.enabled:
+        yield from iterable
+        return
+    it = iter(iterable)
+    while True:
+        with Stage(name):
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+        yield item
+
+
+def report():
+    return {
+        'wall_seconds': time.perf_counter() - _inst.start,
+        'workers': len(_inst.worker_pids),
+        'tasks': _inst.tasks,
+        'stages': {name: dict(stats) for name, stats in sorted(_inst.stages.items())},
+        'counters': dict(sorted(_inst.counters.items())),
+    }
+
+
+def merge(worker_report):
+    # adds the report of a worker process to the current one
+    if not worker_report:
+        return
+    _inst.worker_pids.add(worker_report['pid'])
+    _inst.tasks += 1
+    for name, stats in worker_report['stages'].items():
+        mine = _inst.stages.setdefault(name, {'calls': 0, 'seconds': 0.0})
+        mine['calls'] += stats['calls']
+        mine['seconds'] += stats['seconds']
+    _inst.counters.update(worker_report['counters'])
+
+
+def worker_settings():
+    # what a worker process needs to instrument itself like its parent, None when disabled
+    if not _inst.enabled:
+        return None
+    return {'profile_dir': str(_inst.profile_dir) if _inst.profile_dir else None}
+
+
+def start_worker(settings):
+    # to be called at the start of a task run in a worker process, with what worker_settings() gave in the parent
+    if settings is not None:
+        enable(**settings)
+
+
+def finish_worker(settings):
+    # to be called at the end of the task. returns the report to send back to the parent for merge()
+    if settings is None:
+        return None
+    dump_profiles(suffix=f'.{os.getpid()}.{next(_worker_tasks)}')
+    return {**report(), 'pid': os.getpid()}
+
+
+def dump_profiles(suffix=''):
+    if not _inst.profile_dir:
+        return []
+    _inst.profile_dir.mkdir(parents=True, exist_ok=True)
+    out = []
+    for name, profile in _inst.profiles.items():
+        out_file = _inst.profile_dir / f'{name}{suffix}.prof'
+        profile.dump_stats(out_file)
+        out.append(out_file)
+    return out
+
+
+def save_report(out_file=None):
+    # writes the json report, if out_file is given, and the profiles, if a profile_dir was given
+    if out_file:
+        out_file = Path(out_file)
+        out_file.parent.mkdir(parents=True, exist_ok=True)
+        out_file.write_text(json.dumps(report(), ensure_ascii=False, indent=4), encoding='utf-8')
+    dump_profiles()
+    return out_file
@@ -1,2 +1,4 @@
-from .parse_footnotes import parse_cbeta_2_pecha
-from .parse_cbeta_xml_triplets import parse_cbeta_xml_triplets
\ No newline at end of file
+from .parse_footnotes import parse_cbeta_2_pecha, parse_cbeta_2_pecha_batch
+from .parse_cbeta_xml_triplets import parse_cbeta_xml_triplets
+from .pecha_json import export_pecha_json
+from .segment_store import SegmentStore
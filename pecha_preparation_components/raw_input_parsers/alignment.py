@@ -0,0 +1,74 @@
+from array import array
+
+# how sentences are glued when a link targets several of them
+SEPARATORS = {'bo': ' ', 'zh': ''}
+
+
+def join_sentences(parts, sep):
+    out = ''
+    for p in parts:
+        if out and sep and not out[-1].isspace():
+            out += sep
+        out += p
+    return out
+
+
+class LinkTable:
+    """
+    alignment links of a .bo.zh.xml file.
+    sentence ids are interned and each side of a link is stored as a slice of a flat array,
+    so 1-2, 2-1, 2-2, etc. links take the same room as 1-1 links.
+    """
+    def __init__(self, links):
+        self.types = []
+        self.names = []  # interned sentence ids
+        self.offsets = {'zh': array('L', [0]), 'bo': array('L', [0])}
+        self.targets = {'zh': array('L'), 'bo': array('L')}
+        ids = {}
+        for type_, zh, bo in links:
+            self.types.append(type_)
+            for lang, sent_ids in (('zh', zh), ('bo', bo)):
+                for s in sent_ids:
+                    if s not in ids:
+                        ids[s] = len(self.names)
+                        self.names.append(s)
+                    self.targets[lang].append(ids[s])
+                self.offsets[lang].append(len(self.targets[lang]))
+
+    def __len__(self):
+        return len(self.types)
+
+    def link_ids(self, num, lang):
+        offsets = self.offsets[lang]
+        return [self.names[i] for i in self.targets[lang][offsets[num]:offsets[num + 1]]]
+
+    def __resolve(self, sentences, lang):
+        # one text per link, each link's sentences concatenated
+        texts = [sentences.get(n) for n in self.names]
+        offsets, targets, sep = self.offsets[lang], self.targets[lang], SEPARATORS[lang]
+        out = []
+        for num in range(len(self.types)):
+            parts = [texts[i] for i in targets[offsets[num]:offsets[num + 1]]]
+            out.append(join_sentences([p for p in parts if p is not None], sep))
+        return out
+
+    def align(self, bo_sentences, zh_sentences):
+        bo = self.__resolve(bo_sentences, 'bo')
+        zh = self.__resolve(zh_sentences, 'zh')
+        return [[b, z] for b, z in zip(bo, zh)]
+
+    def coverage(self, bo_sentences, zh_sentences):
+        """
+        unaligned: sentences of a language that no link points to
+        dangling: ids found in the links that don't exist in a language
+        """
+        stats = {'links': len(self), 'types': {}, 'unaligned': {}, 'dangling': {}}
+        for t in self.types:
+            stats['types'][t] = stats['types'].get(t, 0) + 1
+        for lang, sentences in (('bo', bo_sentences), ('zh', zh_sentences)):
+            linked = set()
+            for i in self.targets[lang]:
+                linked.add(self.names[i])
+            stats['unaligned'][lang] = [s for s in sentences if s not in linked]
+            stats['dangling'][lang] = [s for s in sorted(linked) if s not in sentences]
+        return stats
@@ -0,0 +1,47 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+def file_hash(path, chunk_size=1048576):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_files(files):
+    return {str(f): file_hash(f) for f in sorted(files)}
+
+
+class BuildManifest:
+    """
+    content hashes of the inputs and outputs of every work of a previous run.
+    a work is up to date when its inputs hash the same and its outputs are still there, unchanged.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.works = {}
+        if self.path.is_file():
+            self.works = json.loads(self.path.read_text(encoding='utf-8'))
+
+    def is_current(self, work, input_hashes):
+        entry = self.works.get(work)
+        if not entry or entry['inputs'] != input_hashes:
+            return False
+        for out_file, h in entry['outputs'].items():
+            if not Path(out_file).is_file() or file_hash(out_file) != h:
+                return False
+        return True
+
+    def record(self, work, input_hashes, out_files):
+        self.works[work] = {'inputs': input_hashes, 'outputs': hash_files(out_files)}
+
+    def save(self):
+        # write to a temp file first so that an interrupted run doesn't leave a corrupted manifest
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.works, ensure_ascii=False, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp, self.path)
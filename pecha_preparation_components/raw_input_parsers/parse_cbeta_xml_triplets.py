@@ -1,7 +1,19 @@
+import hashlib
+import io
+import json
 import re
+import traceback
 from pathlib import Path
 from collections import defaultdict
-from docx import Document  # from bayoo_docx
+from contextlib import redirect_stdout
+
+from .. import instrumentation
+from .alignment import LinkTable
+from .docx_writer import write_docx
+from .manifest import BuildManifest, hash_files
+from .pecha_json import export_pecha_json, load_titles, resolve_work
+from .segment_store import SegmentStore, parse_work_name
+from .xml_reader import iter_links, iter_sentences
 
 
 def find_triplet(files):
@@ -21,6 +33,7 @@ def find_triplet(files):
     return tri
 
 
+@instrumentation.timed('discovery')
 def parse_triplets(in_folder):
     # requires xml files triplets each in a sub_folder.  no more than 1 level
     modern_folder_name = "Modern Chinese"
@@ -46,32 +59,26 @@ def parse_triplets(in_folder):
                 if len(v) != 3:
                     incomplete[folder] = {k: v}
                     del total[folder][h][k]
+    instrumentation.count('works', len(total))
+    instrumentation.count('incomplete_triplets', len(incomplete))
     return total, incomplete
 
 def parse_lang(in_file):
-    dump = in_file.read_text()
-    lines = dump.split('\n')
-    out = {}
-    for line in lines:
-        if '"/>' in line:
-            a = re.findall(r's id=\"([0-9\:]+)\"\/>', line)
-            a.append('')
-        else:
-            a = re.findall(r's id=\"([0-9\:]+)\">([^<]+)<\/s>', line)
-            a = a[0] if a else []
-        if a:
-            out[a[0]] = a[1]
-    return out
+    with instrumentation.stage('xml_parsing'):
+        sentences = dict(iter_sentences(in_file))
+    instrumentation.count('xml_files')
+    instrumentation.count('sentences', len(sentences))
+    return sentences
 
 def parse_table(in_file):
-    dump = in_file.read_text()
-    a = re.findall(r"type='([0-9\-]+)' xtargets='([0-9\:]*?)\;([0-9\:]*?)' status", dump)
-    out = []
-    for i, j, k in a:
-        out.append({'type': i, 'zh': j, 'bo': k})
-    return out
-
-def align_triplet(triplet):
+    with instrumentation.stage('xml_parsing'):
+        table = LinkTable(iter_links(in_file))
+    instrumentation.count('xml_files')
+    instrumentation.count('links', len(table))
+    return table
+
+def align_triplet(triplet, with_ids=False):
+    # with_ids: also return the bo and zh sentence ids of each aligned line
     # get file name
     name = triplet['bo'].name.split('.')[0]
     print('\t', name)
@@ -82,27 +89,47 @@ def align_triplet(triplet):
     table = parse_table(triplet['bo_zh'])
 
     # align
-    aligned = []
-    for t in table:
-        bo, zh = t['bo'], t['zh']
-        entry = ['', '']
-        if bo:
-            try:
-                entry[0] = lang1[bo]
-            except:
-                print('\t\tbo: ', bo)
-        if zh:
-            try:
-                entry[1] = lang2[zh]
-            except:
-                print('\t\tzh: ', zh)
-        aligned.append(entry)
+    with instrumentation.stage('alignment'):
+        aligned = table.align(lang1, lang2)
+        stats = table.coverage(lang1, lang2)
+    instrumentation.count('aligned_lines', len(aligned))
+    for lang in ['bo', 'zh']:
+        instrumentation.count('missing_ids', len(stats['dangling'][lang]))
+        instrumentation.count('unaligned_sentences', len(stats['unaligned'][lang]))
+
+    # report what could not be aligned
+    for lang in ['bo', 'zh']:
+        for s in stats['dangling'][lang]:
+            print(f'\t\t{lang}: ', s)
+        unaligned = stats['unaligned'][lang]
+        if unaligned:
+            print(f'\t\t{len(unaligned)} unaligned {lang} sentences:', ' '.join(unaligned))
+    if with_ids:
+        ids = [(table.link_ids(num, 'bo'), table.link_ids(num, 'zh')) for num in range(len(table))]
+        return name, aligned, ids
     return name, aligned
 
-def write_documents(folder, filename, sim_trad, aligned):
+@instrumentation.timed('docx_writing')
+def write_documents(folder, filename, sim_trad, aligned, fast=False):
     # export to docx and parse footnotes
     if not folder.exists():
         folder.mkdir(parents=True, exist_ok=True)
+    if sim_trad == 'simp':
+        st = 'simplified_'
+    else:
+        st = ''
+    out_bo = folder / f'{filename}_{st}bo.docx'
+    out_zh = folder / f'{filename}_{st}zh.docx'
+
+    if fast:
+        # same documents, written as xml straight into the zip files instead of through python-docx
+        write_docx(out_bo, (bo for bo, _ in aligned))
+        write_docx(out_zh, (zh for _, zh in aligned), parse_footnotes=True)
+        instrumentation.count('docx_files', 2)
+        return [out_bo, out_zh]
+
+    from docx import Document  # from bayoo_docx, only imported when needed as it is slow to load
+
     doc_bo = Document()
     doc_zh = Document()
     line_num = 1
@@ -132,32 +159,187 @@ def write_documents(folder, filename, sim_trad, aligned):
                     try:
                         par.add_footnote(footnotes[f_num])
                         f_num += 1
+                        instrumentation.count('footnotes')
                     except:
                         print("unable to parse note:", zh)
         else:
             doc_zh.add_paragraph(f'{line_num}. {zh}')
         line_num += 1
 
-    if sim_trad == 'simp':
-        st = 'simplified_'
-    else:
-        st = ''
-    doc_bo.save(folder / f'{filename}_{st}bo.docx')
-    doc_zh.save(folder / f'{filename}_{st}zh.docx')
+    doc_bo.save(out_bo)
+    doc_zh.save(out_zh)
+    instrumentation.count('docx_files', 2)
+    return [out_bo, out_zh]
+
+def json_source(work, catalog, titles):
+    """
+    what the pecha.org json of a work is made from besides its segments: [Tibetan title, categories], found from
+    the Toh number of the folder name (Toh0198_kp0016_<Chinese title>) with resolve_work(), titles being
+    {Toh number: Tibetan title} from load_titles(). the message of the LookupError if the work can't be found
+    """
+    try:
+        return list(resolve_work(catalog, titles, parse_work_name(work)['toh']))
+    except LookupError as e:
+        return str(e)
+
+
+def write_pecha_json(folder, work, sim_trad, aligned, bo_title, categories):
+    st = 'simplified_' if sim_trad == 'simp' else ''
+    out_file = folder / f'{work}_{st}pecha.json'
+    zh_title = parse_work_name(work)['title']
+    return [export_pecha_json(out_file, aligned, None, bo_title, zh_title, categories=categories)]
+
 
-def parse_cbeta_xml_triplets(in_folder, out_folder):
+def process_work(work, parts, out_folder, source=None, fast_docx=False, instrument=None, segments=False):
+    # aligns and exports a single work. the output is captured so that works processed
+    # in parallel don't interleave their logs, and errors are returned instead of raised
+    # so that a failing work doesn't stop the batch.
+    # source: to also export the work to pecha.org json, as given by json_source(). if the work could not be found,
+    # only its docx are written, the reason being returned as json_error
+    # instrument is set when running in a worker process, see instrumentation.worker_settings()
+    # segments: also return the segments of each variant for the SegmentStore, that is written by the parent process
+    instrumentation.start_worker(instrument)
+    log = io.StringIO()
+    error, json_error = None, None
+    out_files = []
+    work_segments = {}
+    with redirect_stdout(log):
+        print(work)
+        try:
+            if isinstance(source, str):
+                json_error = source
+                print(f'\t\tno pecha.org json: {json_error}')
+            cur_out_folder = out_folder / work
+            for h, p in parts.items():
+                if not p:
+                    continue
+                out = []
+                sorted_parts = [p[s] for s in sorted(p.keys())]
+                for tri in sorted_parts:
+                    if segments:
+                        name, aligned, ids = align_triplet(tri, with_ids=True)
+                        work_segments.setdefault(h, []).extend(
+                            (name, bo, zh, bo_ids, zh_ids) for (bo, zh), (bo_ids, zh_ids) in zip(aligned, ids))
+                    else:
+                        _, aligned = align_triplet(tri)
+                    out.extend(aligned)
+                out_files.extend(write_documents(cur_out_folder, work, h, out, fast=fast_docx))
+                if source is not None and not json_error:
+                    out_files.extend(write_pecha_json(cur_out_folder, work, h, out, *source))
+        except Exception:
+            error = traceback.format_exc()
+    return {'work': work, 'log': log.getvalue(), 'error': error, 'json_error': json_error, 'out_files': out_files,
+            'segments': work_segments, 'report': instrumentation.finish_worker(instrument)}
+
+
+def report_work(result):
+    print(result['log'], end='')
+    if result['error']:
+        print(f'!!! {result["work"]} failed:')
+        print(result['error'], end='')
+
+
+def work_inputs(parts):
+    return [f for p in parts.values() if p for tri in p.values() for f in tri.values()]
+
+
+def store_work(store, result):
+    with instrumentation.stage('segment_store'):
+        for variant, segments in result['segments'].items():
+            instrumentation.count('stored_segments', store.add_work(result['work'], variant, segments))
+    # they are not kept in memory with the other results once saved
+    result['segments'] = {}
+
+
+def parse_cbeta_xml_triplets(in_folder, out_folder, workers=1, force=False, dry_run=False, catalog_file=None,
+                             fast_docx=False, store_file=None, metadata_path=None):
+    # the manifest is kept next to the exported files to only rebuild the works that changed
+    # if a catalog.json from parse_catalog.py is given, the works are also exported to pecha.org json. their Tibetan
+    # titles are found from their Toh numbers in the text metadata of metadata_path, by default the folder of the
+    # catalog, where parse_catalog.py reads it. works that can't be found are only exported to docx.
+    # the title and categories of each work are part of its input hashes, so that a change to the catalog or the
+    # metadata only rebuilds the works it concerns
+    # if a store_file is given, the aligned segments are also saved in that SegmentStore database, the works
+    # missing from it being rebuilt
+    catalog, titles = None, None
+    if catalog_file:
+        catalog = json.loads(Path(catalog_file).read_text(encoding='utf-8'))
+        metadata_path = Path(metadata_path) if metadata_path else Path(catalog_file).parent
+        titles = load_titles(metadata_path)
+        if not titles:
+            raise FileNotFoundError(f'no text metadata with a Toh number in {metadata_path}, the Tibetan titles of '
+                                    f'the works are needed to export them to json')
+    manifest = BuildManifest(out_folder / 'manifest.json')
     out_folder = out_folder / 'Gold Standard'
+    # a dry run only reads the store, to list the works missing from it as the real run would rebuild them
+    store = SegmentStore(store_file, read_only=dry_run) if store_file else None
 
     triplets, incomplete = parse_triplets(in_folder)
-    for work, parts in triplets.items():
-        print(work)
-        cur_out_folder = out_folder / work
-        for h, p in parts.items():
-            if not p:
-                continue
-            out = []
-            sorted_parts = [p[s] for s in sorted(p.keys())]
-            for tri in sorted_parts:
-                _, aligned = align_triplet(tri)
-                out.extend(aligned)
-            write_documents(cur_out_folder, work, h, out)
\ No newline at end of file
+    to_build, input_hashes, sources = {}, {}, {}
+    for work, parts in sorted(triplets.items()):
+        with instrumentation.stage('input_hashing'):
+            input_hashes[work] = hash_files(work_inputs(parts))
+            if catalog is not None:
+                sources[work] = json_source(work, catalog, titles)
+                dump = json.dumps(sources[work], ensure_ascii=False, sort_keys=True)
+                input_hashes[work]['pecha_json'] = hashlib.sha256(dump.encode('utf-8')).hexdigest()
+        if force or not manifest.is_current(work, input_hashes[work]) or (store and not store.has_work(work)):
+            to_build[work] = parts
+    print(f'{len(to_build)} of {len(triplets)} works to rebuild')
+
+    if dry_run:
+        if store:
+            store.close()
+        for work in to_build:
+            print('\t', work)
+        return [{'work': w, 'log': '', 'error': None, 'json_error': None, 'out_files': [], 'segments': {},
+                 'report': None} for w in to_build]
+
+    results = []
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor  # slow to import, and only needed here
+
+        instrument = instrumentation.worker_settings()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {work: executor.submit(process_work, work, parts, out_folder, sources.get(work), fast_docx,
+                                             instrument, store is not None)
+                       for work, parts in to_build.items()}
+            # results are collected in the order of the works, whatever the order they finish in
+            for work, future in futures.items():
+                try:
+                    result = future.result()
+                except Exception:
+                    # the worker process itself died
+                    result = {'work': work, 'log': f'{work}\n', 'error': traceback.format_exc(), 'json_error': None,
+                              'out_files': [], 'segments': {}, 'report': None}
+                instrumentation.merge(result['report'])
+                report_work(result)
+                if store and not result['error']:
+                    store_work(store, result)
+                results.append(result)
+    else:
+        for work, parts in to_build.items():
+            result = process_work(work, parts, out_folder, sources.get(work), fast_docx,
+                                  segments=store is not None)
+            report_work(result)
+            if store and not result['error']:
+                store_work(store, result)
+            results.append(result)
+    if store:
+        store.close()
+
+    instrumentation.count('works_failed', len([r for r in results if r['error']]))
+    for r in results:
+        if not r['error']:
+            manifest.record(r['work'], input_hashes[r['work']], r['out_files'])
+    with instrumentation.stage('manifest'):
+        manifest.save()
+
+    failed = [r['work'] for r in results if r['error']]
+    if failed:
+        print(f'{len(failed)} of {len(results)} works failed:', ', '.join(failed))
+    no_json = [r['work'] for r in results if r['json_error'] and not r['error']]
+    instrumentation.count('works_without_json', len(no_json))
+    if no_json:
+        print(f'{len(no_json)} of {len(results)} works not exported to json:', ', '.join(no_json))
+    return results
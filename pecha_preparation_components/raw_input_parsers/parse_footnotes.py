@@ -1,19 +1,25 @@
 import re
 
-def parse_cbeta_2_pecha(text: str):
-    # cbeta: "^1[this is the note]"
+# cbeta: "^1[this is the note]"
+CBETA_FOOTNOTE = re.compile(r'\^([0-9]+)\[([^\]]+)\]')
+
+
+def to_pecha_footnote(match):
     # pecha: "<sup class="footnote-marker">1</sup><i class="footnote">this is the note</i>"
-    pattern_whole = r'(\^[0-9]+\[[^\]]+\])'
-    pattern_split = r'\^([0-9]+)\[([^\]]+)\]'
+    return f'<sup class="footnote-marker">{match[1]}</sup><i class="footnote">{match[2]}</i>'
+
+
+def parse_cbeta_2_pecha(text: str):
+    if '^' not in text:
+        return text
+    return CBETA_FOOTNOTE.sub(to_pecha_footnote, text)
 
-    out = []
-    parts = re.split(pattern_whole, text)
-    for p in parts:
-        if p.startswith('^') and '[' in p and p.endswith(']'):
-            _, marker, text, _ = re.split(pattern_split, p)
-            parsed = f'<sup class="footnote-marker">{marker}</sup><i class="footnote">{text}</i>'
-            out.append(parsed)
-        else:
-            out.append(p)
 
-    return ''.join(out)
+def parse_cbeta_2_pecha_batch(segments):
+    """
+    converts the footnotes of many segments, lazily: any iterable of strings can be given
+    and a generator is returned so that large texts can be streamed.
+    """
+    sub = CBETA_FOOTNOTE.sub
+    for text in segments:
+        yield sub(to_pecha_footnote, text) if '^' in text else text
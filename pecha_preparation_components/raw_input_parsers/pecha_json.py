@@ -0,0 +1,141 @@
+import json
+import re
+from pathlib import Path
+from textwrap import indent
+
+from .. import instrumentation
+from .parse_footnotes import parse_cbeta_2_pecha_batch
+
+IND = ' ' * 4
+# the Toh numbers of the "presentation" field of the text metadata: Toh0225, Toh 225
+TOH = re.compile(r'Toh\s*([0-9]+[a-z]*)', re.IGNORECASE)
+
+
+def find_categories(catalog, title):
+    """
+    the category data, from the top level down, of the category holding the work called title
+    in a catalog given by CatalogManager.parse_catalog(). [] if the work is not in the catalog
+    """
+    def walk(node, path):
+        data = [v for k, v in node.items() if 'data' in k]
+        path = path + data[:1]
+        for d in data:
+            if any(w[0] == title for w in d['works']):
+                return path
+        for k, v in node.items():
+            if 'data' not in k and isinstance(v, dict):
+                found = walk(v, path)
+                if found:
+                    return found
+        return None
+
+    return walk(catalog, []) or []
+
+
+def toh_key(number):
+    # Toh numbers are written with or without leading zeros: 0225 and 225 are the same text
+    return number.lower().lstrip('0')
+
+
+def titles_by_toh(metadata):
+    """
+    {Toh number: Tibetan title} of the texts of metadata, as given by parse_text_metadata(), found in their
+    "presentation" field. the titles are the names of the texts in the catalog
+    """
+    titles = {}
+    for title, meta in metadata.items():
+        for value in meta.get('presentation', {}).values():
+            match = TOH.fullmatch(value.strip()) if isinstance(value, str) else None
+            if match:
+                titles[toh_key(match[1])] = title
+    return titles
+
+
+def load_titles(metadata_path, cache_path=None):
+    # the text metadata is read as CatalogManager reads it, the catalog_parser dependencies being only needed here
+    from ..catalog_parser.catalog_manager import parse_text_metadata
+
+    return titles_by_toh(parse_text_metadata(Path(metadata_path), cache_path=cache_path))
+
+
+def resolve_work(catalog, titles, toh):
+    """
+    the Tibetan title and the categories, as given by find_categories(), of the text with the Toh number toh.
+    titles: {Toh number: Tibetan title} from titles_by_toh()
+    raises LookupError if there is no metadata for that number or the title is not in the catalog
+    """
+    if not toh:
+        raise LookupError('no Toh number to find the text in the metadata')
+    bo_title = titles.get(toh_key(toh))
+    if not bo_title:
+        raise LookupError(f'Toh{toh} is in none of the text metadata files')
+    categories = find_categories(catalog, bo_title)
+    if not categories:
+        raise LookupError(f'Toh{toh} ({bo_title}) is not in the catalog')
+    return bo_title, categories
+
+
+def format_categories(categories, lang, desc_prefix):
+    # category fields come in the order of the catalog legend: name, description, short description
+    out = []
+    for cat in categories:
+        name, desc, short_desc = [cat[k] for k in cat if k != 'works'][:3]
+        out.append({
+            'name': name.get(lang) or '',
+            f'{desc_prefix}Desc': desc.get(lang) or '',
+            f'{desc_prefix}ShortDesc': short_desc.get(lang) or '',
+        })
+    return out
+
+
+def dump(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def write_side(f, key, categories, book, segments, section, last):
+    # one of "source" or "target", the segments being written one by one
+    f.write(f'{IND}{dump(key)}: {{\n')
+    cats = indent(json.dumps(categories, ensure_ascii=False, indent=4), IND * 2).lstrip()
+    f.write(f'{IND * 2}"categories": {cats},\n')
+    f.write(f'{IND * 2}"books": [\n{IND * 3}{{\n')
+    for k, v in book.items():
+        f.write(f'{IND * 4}{dump(k)}: {dump(v)},\n')
+    f.write(f'{IND * 4}"content": {{\n{IND * 5}{dump(section)}: {{\n{IND * 6}"data": [')
+    first = True
+    for seg in segments:
+        f.write(f'\n{IND * 7}{dump(seg)}' if first else f',\n{IND * 7}{dump(seg)}')
+        first = False
+    f.write(f'\n{IND * 6}]\n{IND * 5}}}\n{IND * 4}}}\n{IND * 3}}}\n{IND * 2}]\n{IND}}}')
+    f.write('\n' if last else ',\n')
+
+
+@instrumentation.timed('json_writing')
+def export_pecha_json(out_file, aligned, catalog, bo_title, zh_title, section=None, version_source=' ',
+                      complete_status='done', categories=None):
+    """
+    writes aligned [bo, zh] pairs, as given by align_triplet(), to a pecha.org json file (see
+    docs/sample_files/template_6_complex-text_with_translation.json): the Chinese translation as source, the Tibetan
+    as target. the file is written segment by segment, footnotes being converted on the fly.
+    categories: as given by find_categories(), looked up from the titles if not given
+    """
+    if categories is None:
+        categories = find_categories(catalog, bo_title) or find_categories(catalog, zh_title)
+    if not categories:
+        print(f'\t\t{bo_title or zh_title} not found in the catalog')
+    section = section if section else zh_title
+
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_file, 'w', encoding='utf-8') as f:
+        f.write('{\n')
+        zh_book = {'title': zh_title, 'language': 'zh', 'versionSource': version_source,
+                   'completestatus': complete_status}
+        zh_segments = instrumentation.timed_iter('footnotes', parse_cbeta_2_pecha_batch(zh for _, zh in aligned))
+        write_side(f, 'source', format_categories(categories, 'en', 'en'), zh_book, zh_segments, section, False)
+        bo_book = {'title': bo_title, 'language': 'bo', 'versionSource': version_source,
+                   'completestatus': complete_status}
+        bo_segments = (bo for bo, _ in aligned)
+        write_side(f, 'target', format_categories(categories, 'bo', 'he'), bo_book, bo_segments, section, True)
+        f.write('}\n')
+    instrumentation.count('json_files')
+    instrumentation.count('json_segments', 2 * len(aligned))
+    return out_file
@@ -0,0 +1,199 @@
+import re
+import sqlite3
+from pathlib import Path
+
+from .parse_footnotes import CBETA_FOOTNOTE
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS works (
+    id INTEGER PRIMARY KEY,
+    work TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    toh TEXT,
+    kp TEXT,
+    title TEXT,
+    UNIQUE (work, variant)
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    work_id INTEGER NOT NULL REFERENCES works (id) ON DELETE CASCADE,
+    num INTEGER NOT NULL,
+    part TEXT,
+    bo TEXT NOT NULL,
+    zh TEXT NOT NULL,
+    zh_text TEXT NOT NULL,
+    bo_ids TEXT,
+    zh_ids TEXT
+);
+CREATE INDEX IF NOT EXISTS segments_work ON segments (work_id, num);
+CREATE TABLE IF NOT EXISTS footnotes (
+    segment_id INTEGER NOT NULL REFERENCES segments (id) ON DELETE CASCADE,
+    marker TEXT,
+    note TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS footnotes_segment ON footnotes (segment_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5 (
+    bo, zh_text, content='segments', content_rowid='id', tokenize='trigram'
+);
+'''
+
+# the trigram tokenizer can't match less than 3 characters
+MIN_MATCH = 3
+
+
+def parse_work_name(work):
+    # the folder names are in the form Toh0198_kp0016_<Chinese title>, the identifiers being optional
+    toh = re.search(r'(?:^|_)Toh([^_]+)', work, re.IGNORECASE)
+    kp = re.search(r'(?:^|_)kp([^_]+)', work, re.IGNORECASE)
+    title = re.sub(r'(?:^|_)(?:Toh|kp)[^_]+', '', work, flags=re.IGNORECASE).strip('_')
+    return {'toh': toh[1] if toh else None, 'kp': kp[1] if kp else None, 'title': title or work}
+
+
+def fts_phrase(query):
+    return '"' + query.replace('"', '""') + '"'
+
+
+class SegmentStore:
+    """
+    the aligned segments of all the works in a SQLite database, with a full-text index of both languages.
+
+    works: one row per work and variant ("trad" or "simp"), with the Toh and kp numbers found in the work name
+    segments: the aligned lines of each work in order. zh keeps the CBETA footnotes ("^1[note]"), zh_text is the
+              same text without them, that is indexed along with bo. bo_ids and zh_ids are the sentence ids of
+              the line, separated by spaces
+    footnotes: the footnotes of each segment
+    segments_fts: the full-text index of segments, kept up to date by add_work(). it is filled a work at a time, which
+                  is about 4 times faster than with triggers updating it a segment at a time
+
+    read_only: the database is only queried, neither created nor changed. a missing database is an empty store
+    """
+    def __init__(self, db_file, read_only=False):
+        self.db_file = Path(db_file)
+        if read_only and self.db_file.is_file():
+            self.conn = sqlite3.connect(self.db_file.resolve().as_uri() + '?mode=ro', uri=True)
+        elif read_only:
+            self.conn = sqlite3.connect(':memory:')
+            self.conn.executescript(SCHEMA)
+        else:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.db_file)
+            self.conn.execute('PRAGMA foreign_keys = ON')
+            self.conn.execute('PRAGMA journal_mode = WAL')
+            self.conn.executescript(SCHEMA)
+        self.conn.row_factory = sqlite3.Row
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def add_work(self, work, variant, segments):
+        """
+        replaces the segments of a work in a single transaction.
+        segments: (part, bo, zh, bo_ids, zh_ids) tuples in the order of the lines, sentence ids being lists
+        """
+        meta = parse_work_name(work)
+        with self.conn:
+            old = self.conn.execute('SELECT id FROM works WHERE work = ? AND variant = ?', (work, variant)).fetchone()
+            if old:
+                self.conn.execute("INSERT INTO segments_fts (segments_fts, rowid, bo, zh_text) "
+                                  "SELECT 'delete', id, bo, zh_text FROM segments WHERE work_id = ?", (old['id'],))
+                # segments and footnotes go with it
+                self.conn.execute('DELETE FROM works WHERE id = ?', (old['id'],))
+            work_id = self.conn.execute('INSERT INTO works (work, variant, toh, kp, title) VALUES (?, ?, ?, ?, ?)',
+                                        (work, variant, meta['toh'], meta['kp'], meta['title'])).lastrowid
+            rows, notes = [], []
+            # ids are given here so that footnotes can point to their segments without a query per segment
+            first_id = (self.conn.execute('SELECT max(id) FROM segments').fetchone()[0] or 0) + 1
+            for num, (part, bo, zh, bo_ids, zh_ids) in enumerate(segments):
+                seg_id = first_id + num
+                zh_text = zh
+                if '^' in zh:
+                    notes.extend((seg_id, m[1], m[2]) for m in CBETA_FOOTNOTE.finditer(zh))
+                    zh_text = CBETA_FOOTNOTE.sub('', zh)
+                rows.append((seg_id, work_id, num + 1, part, bo, zh, zh_text, ' '.join(bo_ids or []),
+                             ' '.join(zh_ids or [])))
+            self.conn.executemany('INSERT INTO segments (id, work_id, num, part, bo, zh, zh_text, bo_ids, zh_ids) '
+                                  'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self.conn.executemany('INSERT INTO footnotes (segment_id, marker, note) VALUES (?, ?, ?)', notes)
+            self.conn.execute('INSERT INTO segments_fts (rowid, bo, zh_text) '
+                              'SELECT id, bo, zh_text FROM segments WHERE work_id = ?', (work_id,))
+        return len(rows)
+
+    def has_work(self, work, variant=None):
+        if variant:
+            query, args = 'SELECT 1 FROM works WHERE work = ? AND variant = ?', (work, variant)
+        else:
+            query, args = 'SELECT 1 FROM works WHERE work = ?', (work,)
+        return self.conn.execute(query, args).fetchone() is not None
+
+    def works(self):
+        return [dict(r) for r in self.conn.execute(
+            'SELECT w.work, w.variant, w.toh, w.kp, w.title, count(s.id) AS segments '
+            'FROM works w LEFT JOIN segments s ON s.work_id = w.id GROUP BY w.id ORDER BY w.work, w.variant')]
+
+    def segments(self, work, variant='trad'):
+        # all the segments of a work, in order, with their footnotes
+        rows = self.conn.execute(
+            'SELECT s.id, s.num, s.part, s.bo, s.zh, s.zh_text, s.bo_ids, s.zh_ids FROM segments s '
+            'JOIN works w ON w.id = s.work_id WHERE w.work = ? AND w.variant = ? ORDER BY s.num', (work, variant))
+        out = [dict(r) for r in rows]
+        notes = {}
+        if out:
+            query = 'SELECT segment_id, marker, note FROM footnotes WHERE segment_id BETWEEN ? AND ? ORDER BY rowid'
+            for r in self.conn.execute(query, (out[0]['id'], out[-1]['id'])):
+                notes.setdefault(r['segment_id'], []).append({'marker': r['marker'], 'note': r['note']})
+        for seg in out:
+            seg['bo_ids'] = seg['bo_ids'].split()
+            seg['zh_ids'] = seg['zh_ids'].split()
+            seg['footnotes'] = notes.get(seg.pop('id'), [])
+        return out
+
+    def aligned(self, work, variant='trad'):
+        # the [bo, zh] pairs as align_triplet() gives them, footnotes included
+        return [[r[0], r[1]] for r in self.conn.execute(
+            'SELECT s.bo, s.zh FROM segments s JOIN works w ON w.id = s.work_id '
+            'WHERE w.work = ? AND w.variant = ? ORDER BY s.num', (work, variant))]
+
+    def search(self, query, lang=None, work=None, limit=100):
+        """
+        segments containing query, in bo, in zh (footnotes left out) or in both if lang is None.
+        queries of 3 characters or more use the full-text index, shorter ones scan the segments
+        """
+        columns = {'bo': ['bo'], 'zh': ['zh_text'], None: ['bo', 'zh_text']}[lang]
+        args = []
+        if len(query) >= MIN_MATCH:
+            target = '{' + ' '.join(columns) + '}' if len(columns) > 1 else columns[0]
+            where = 's.id IN (SELECT rowid FROM segments_fts WHERE segments_fts MATCH ?)'
+            args.append(f'{target} : {fts_phrase(query)}')
+        else:
+            where = '(' + ' OR '.join(f"instr(s.{c}, ?) > 0" for c in columns) + ')'
+            args.extend([query] * len(columns))
+        if work:
+            where += ' AND w.work = ?'
+            args.append(work)
+        args.append(limit)
+        return [dict(r) for r in self.conn.execute(
+            f'SELECT w.work, w.variant, s.num, s.bo, s.zh FROM segments s JOIN works w ON w.id = s.work_id '
+            f'WHERE {where} ORDER BY w.work, w.variant, s.num LIMIT ?', args)]
+
+    def export_docx(self, work, out_folder, variant='trad'):
+        # the same documents as parse_cbeta_xml_triplets() writes, without parsing the xml again
+        from .parse_cbeta_xml_triplets import write_documents
+        return write_documents(Path(out_folder) / work, work, variant, self.aligned(work, variant), fast=True)
+
+    def export_pecha_json(self, work, out_folder, catalog, titles, variant='trad'):
+        # titles: {Toh number: Tibetan title} from pecha_json.load_titles(). raises LookupError if the work can't be
+        # found in them or in the catalog
+        from .parse_cbeta_xml_triplets import json_source, write_pecha_json
+        source = json_source(work, catalog, titles)
+        if isinstance(source, str):
+            raise LookupError(source)
+        folder = Path(out_folder) / work
+        folder.mkdir(parents=True, exist_ok=True)
+        return write_pecha_json(folder, work, variant, self.aligned(work, variant), *source)
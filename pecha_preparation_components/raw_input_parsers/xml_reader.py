@@ -0,0 +1,162 @@
+import html
+import re
+from pathlib import Path
+from xml.parsers import expat
+
+CHUNK_SIZE = 65536
+# files up to this size are read whole with regular expressions, 1.7 times as fast as expat with its python
+# callbacks. larger files are streamed through expat at constant memory, as are the files the expressions can't read
+# exactly: markup inside sentences, comments, CDATA, other encodings
+MAX_IN_MEMORY = 32 * 1024 * 1024
+
+S_TAG = re.compile(r'<s[\s/>]')
+SENTENCE = re.compile(r'<s\s+id\s*=\s*(["\'])([^"\'<&]*)\1\s*(?:/>|>([^<]*)</s\s*>)')
+LINK_TAG = re.compile(r'<link[\s/>]')
+# the links as the aligner writes them: type then xtargets
+TYPE_XTARGETS = re.compile(
+    r'<link\s+type\s*=\s*(["\'])([^"\'<>&]*)\1\s+xtargets\s*=\s*(["\'])([^;"\'<>&]*);([^"\'<>&]*)\3')
+# the type and xtargets of each link, in any order, values with a ">" or an entity being left to LINK
+LINK_TYPE = re.compile(r'<link\s[^>]*?(?<=\s)type\s*=\s*(["\'])([^"\'<>&]*)\1')
+LINK_XTARGETS = re.compile(r'<link\s[^>]*?(?<=\s)xtargets\s*=\s*(["\'])([^;"\'<>&]*);([^"\'<>&]*)\1')
+# attribute values may hold ">"
+LINK = re.compile(r'<link(?=[\s/>])((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>')
+ATTRIBUTE = re.compile(r'([\w:.-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+ENCODING = re.compile(r'<\?xml[^>]*encoding\s*=\s*["\']([^"\']+)')
+
+
+def _stream(in_file, parser, records):
+    # feeds the file to the parser chunk by chunk, yielding the records found in each chunk
+    with open(in_file, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            parser.Parse(chunk, not chunk)
+            yield from records
+            records.clear()
+            if not chunk:
+                break
+
+
+def read_text(in_file):
+    # the whole file if it can be read with the regular expressions, None otherwise
+    in_file = Path(in_file)
+    if in_file.stat().st_size > MAX_IN_MEMORY:
+        return None
+    data = in_file.read_bytes()
+    encoding = ENCODING.match(data[:200].decode('ascii', 'replace'))
+    if encoding and encoding[1].lower().replace('_', '-') not in ('utf-8', 'utf8'):
+        return None
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError:
+        return None  # expat gives the error
+    if '<!--' in text or '<![CDATA[' in text:
+        return None
+    # line ends are normalized as expat does
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def read_sentences(in_file):
+    # the (id, text) pairs of iter_sentences(), read with SENTENCE. None if some <s> elements don't match it
+    text = read_text(in_file)
+    if text is None:
+        return None
+    records = [(m[2], html.unescape(m[3]) if m[3] and '&' in m[3] else m[3] or '') for m in SENTENCE.finditer(text)]
+    if len(records) != len(S_TAG.findall(text)):
+        return None
+    return records
+
+
+def read_links(in_file):
+    # the links of iter_links(), read with the fastest of TYPE_XTARGETS, LINK_TYPE and LINK_XTARGETS, or LINK that
+    # matches all the <link> elements
+    text = read_text(in_file)
+    if text is None:
+        return None
+    count = len(LINK_TAG.findall(text))
+    records = [(t, tuple(zh.split()), tuple(bo.split())) for _, t, _, zh, bo in TYPE_XTARGETS.findall(text)]
+    if len(records) == count:
+        return records
+
+    types, xtargets = LINK_TYPE.findall(text), LINK_XTARGETS.findall(text)
+    if len(types) == len(xtargets) == count:
+        # each <link> has one match of both
+        return [(t, tuple(zh.split()), tuple(bo.split())) for (_, t), (_, zh, bo) in zip(types, xtargets)]
+
+    records = []
+    for m in LINK.finditer(text):
+        attrs = {a[1]: a[2] if a[2] is not None else a[3] for a in ATTRIBUTE.finditer(m[1])}
+        if any('&' in v or '<' in v for v in attrs.values()):
+            return None
+        zh, _, bo = attrs.get('xtargets', '').partition(';')
+        records.append((attrs.get('type', ''), tuple(zh.split()), tuple(bo.split())))
+    if len(records) != count:
+        return None
+    return records
+
+
+def iter_sentences(in_file):
+    """
+    the (id, text) pairs of all the <s id="..."> elements of a sentence file (.bo.xml, .zh.xml, ...), read at once if
+    possible, see read_sentences(), otherwise streamed with stream_sentences()
+    """
+    records = read_sentences(in_file)
+    return iter(records) if records is not None else stream_sentences(in_file)
+
+
+def iter_links(in_file):
+    """
+    the links of an alignment file (.bo.zh.xml, ...) as (type, zh_ids, bo_ids), read at once if possible, see
+    read_links(), otherwise streamed with stream_links()
+    """
+    records = read_links(in_file)
+    return iter(records) if records is not None else stream_links(in_file)
+
+
+def stream_sentences(in_file):
+    """
+    streams the (id, text) pairs of all the <s id="..."> elements of a sentence file (.bo.xml, .zh.xml, ...)
+    text spread over several lines or around inline markup is joined, empty sentences give ''.
+    """
+    records = []
+    cur_id = None
+    text = []
+
+    def start(tag, attrs):
+        nonlocal cur_id
+        if tag == 's' and 'id' in attrs:
+            cur_id = attrs['id']
+            text.clear()
+
+    def end(tag):
+        nonlocal cur_id
+        if tag == 's' and cur_id is not None:
+            records.append((cur_id, ''.join(text)))
+            cur_id = None
+
+    def data(d):
+        if cur_id is not None:
+            text.append(d)
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = data
+    return _stream(in_file, parser, records)
+
+
+def stream_links(in_file):
+    """
+    streams the links of an alignment file (.bo.zh.xml, ...) as (type, zh_ids, bo_ids)
+    xtargets hold "<zh ids>;<bo ids>", each side being a space separated list of sentence ids.
+    """
+    records = []
+
+    def start(tag, attrs):
+        if tag == 'link':
+            zh, _, bo = attrs.get('xtargets', '').partition(';')
+            records.append((attrs.get('type', ''), tuple(zh.split()), tuple(bo.split())))
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start
+    return _stream(in_file, parser, records)
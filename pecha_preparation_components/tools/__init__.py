@@ -1,2 +1,10 @@
-from .ann_transfer import TransferAnnotations
-from .copy_file import copy_file, recursive_copy_metadata
\ No newline at end of file
+from .._lazy import install
+from .copy_file import copy_file, recursive_copy_metadata
+
+# antx is only imported on first use of the annotation transfer
+__all__ = ['copy_file', 'recursive_copy_metadata'] + install(globals(), {
+    'TransferAnnotations': '.ann_transfer',
+    'batch_transfer': '.ann_transfer',
+    'generate_metadata': '.metadata_generator',
+    'validate_tree': '.pecha_json_validator',
+})
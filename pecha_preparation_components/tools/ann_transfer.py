@@ -1,14 +1,84 @@
+import io
+import re
+import time
+import traceback
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from pathlib import Path
 
 from antx import transfer  # installed from wheel in github repo
 
+from .. import instrumentation
+
+
+def annotation_spans(text, anns):
+    # merged (start, end) spans of all the annotations found in text
+    spans = sorted(m.span() for _, pattern in anns for m in re.finditer(pattern, text))
+    merged = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [s for s, _ in merged], [e for _, e in merged]
+
+
+def split_on_anchors(origin, target, anns, chunk_size, anchor_len=32):
+    """
+    cuts origin and target into chunks of about chunk_size characters.
+    each cut is placed right before an anchor: a string free of annotations that appears only once in what remains
+    of both texts, so that the diff of the whole texts would have matched it anyway.
+    returns a list of (origin chunk, target chunk)
+    """
+    starts, ends = annotation_spans(origin, anns)
+    cuts = [(0, 0)]
+    desired = chunk_size
+    while desired < len(origin) - chunk_size // 2:
+        prev_o, prev_t = cuts[-1]
+        o = desired
+        limit = min(desired + chunk_size, len(origin) - anchor_len)
+        found = None
+        while o < limit:
+            # skip the annotations
+            i = bisect_left(ends, o + 1)
+            if i < len(starts) and starts[i] < o + anchor_len:
+                o = ends[i]
+                continue
+            anchor = origin[o:o + anchor_len]
+            t = target.find(anchor, prev_t)
+            if t != -1 and origin.count(anchor, prev_o) == 1 and target.count(anchor, prev_t) == 1:
+                found = o, t
+                break
+            o += anchor_len // 4
+        if found:
+            cuts.append(found)
+            desired = found[0] + chunk_size
+        else:
+            desired = limit + chunk_size
+
+    cuts.append((len(origin), len(target)))
+    return [(origin[o1:o2], target[t1:t2]) for (o1, t1), (o2, t2) in zip(cuts, cuts[1:])]
+
+
+def transfer_chunk(chunk):
+    origin, anns, target = chunk
+    return transfer(origin, anns, target)
+
 
 class TransferAnnotations:
-    def __init__(self, origin, target):
+    def __init__(self, origin, target, chunk_size=None, workers=1, out_file=None):
+        """
+        chunk_size: if set, texts longer than that are cut into chunks of about this many characters, transferred
+                    one by one, or in parallel over workers processes. this avoids diffing two huge texts at once.
+        out_file: where to write the result. defaults to the target's path with its first folder replaced by "output"
+        """
         self.target_file = Path(target)
-        self.out_file = None
+        self.out_file = Path(out_file) if out_file else None
         self.origin = Path(origin).read_text()
         self.target = Path(target).read_text()
+        self.chunk_size = chunk_size
+        self.workers = workers
 
     def transfer_segmentation(self):
         """
@@ -21,13 +91,108 @@ class TransferAnnotations:
         res = self.transfer_anns(anns)
         self.__prepare_out_folder()
         self.out_file.write_text(res)
+        return res
 
+    @instrumentation.timed('annotation_transfer')
     def transfer_anns(self, anns):
-        return transfer(self.origin, anns, self.target)
+        instrumentation.count('transfer_chars', len(self.origin))
+        if not self.chunk_size or len(self.origin) <= self.chunk_size:
+            instrumentation.count('transfer_chunks')
+            return transfer(self.origin, anns, self.target)
+
+        with instrumentation.stage('anchor_split'):
+            chunks = [(o, anns, t) for o, t in split_on_anchors(self.origin, self.target, anns, self.chunk_size)]
+        instrumentation.count('transfer_chunks', len(chunks))
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(transfer_chunk, chunks))
+        else:
+            results = [transfer_chunk(c) for c in chunks]
+        return ''.join(results)
 
     def __prepare_out_folder(self):
-        parts = list(self.target_file.parts)
-        parts[0] = 'output'  # change input to output, but maintain the subfolders
-        out_path = Path('/'.join(parts))
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        self.out_file = out_path
+        if not self.out_file:
+            target = self.target_file
+            if target.is_absolute():
+                try:
+                    target = target.relative_to(Path.cwd())
+                except ValueError:
+                    target = target.relative_to(target.anchor)
+                    target = Path('input', *target.parts)
+            parts = list(target.parts)
+            parts[0] = 'output'  # change input to output, but maintain the subfolders
+            self.out_file = Path(*parts)
+        self.out_file.parent.mkdir(parents=True, exist_ok=True)
+
+
+def pair_files(origin_root, target_root, origin_token='segmented', target_token='clean', pattern='*.txt'):
+    """
+    pairs the files of two directory trees: the target of an origin file has the same relative path,
+    with origin_token replaced by target_token in the file name.
+    returns the (origin, target, relative path of the target) triples and the origin files without a target
+    """
+    origin_root, target_root = Path(origin_root), Path(target_root)
+    pairs, missing = [], []
+    for origin in sorted(origin_root.rglob(pattern)):
+        if origin_token not in origin.name:
+            continue
+        rel = origin.relative_to(origin_root)
+        rel = rel.parent / rel.name.replace(origin_token, target_token)
+        target = target_root / rel
+        if target.is_file() and target != origin:
+            pairs.append((origin, target, rel))
+        else:
+            missing.append(origin)
+    return pairs, missing
+
+
+def transfer_file(origin, target, out_file, chunk_size=None, instrument=None):
+    # instrument is set when running in a worker process, see instrumentation.worker_settings()
+    instrumentation.start_worker(instrument)
+    start = time.perf_counter()
+    error = None
+    try:
+        with redirect_stdout(io.StringIO()):  # antx is verbose
+            ta = TransferAnnotations(origin, target, chunk_size=chunk_size, out_file=out_file)
+            ta.transfer_segmentation()
+    except Exception:
+        error = traceback.format_exc()
+    instrumentation.count('transfer_files')
+    return {'origin': origin, 'out_file': out_file, 'time': time.perf_counter() - start, 'error': error,
+            'report': instrumentation.finish_worker(instrument)}
+
+
+def batch_transfer(origin_root, target_root, out_root, origin_token='segmented', target_token='clean',
+                   pattern='*.txt', workers=1, chunk_size=None):
+    start = time.perf_counter()
+    pairs, missing = pair_files(origin_root, target_root, origin_token, target_token, pattern)
+    for m in missing:
+        print('no target found for', m)
+
+    jobs = [(origin, target, Path(out_root) / rel, chunk_size) for origin, target, rel in pairs]
+    results = []
+    if workers > 1:
+        instrument = instrumentation.worker_settings()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for res in executor.map(transfer_file, *zip(*jobs), [instrument] * len(jobs)):
+                instrumentation.merge(res['report'])
+                report_transfer(res)
+                results.append(res)
+    else:
+        for job in jobs:
+            res = transfer_file(*job)
+            report_transfer(res)
+            results.append(res)
+
+    failed = [r for r in results if r['error']]
+    total = sum(r['time'] for r in results)
+    print(f'{len(results) - len(failed)} of {len(results)} files transferred, {len(missing)} without target, '
+          f'{total:.1f}s of transfers in {time.perf_counter() - start:.1f}s')
+    return results
+
+
+def report_transfer(res):
+    status = 'failed' if res['error'] else 'ok'
+    print(f'{res["time"]:8.2f}s  {status}  {res["out_file"]}')
+    if res['error']:
+        print(res['error'], end='')
@@ -6,7 +6,13 @@ def copy_file(orig_path, dest_path):
     shutil.copy(Path(orig_path), Path(dest_path))
 
 
-def recursive_copy_metadata(template, folder, pattern='*.docx'):
+def recursive_copy_metadata(template, folder, pattern='*.docx', force=False):
+    # existing metadata files are kept unless force is set: they may have been filled in already
+    copied = []
     for f in Path(folder).rglob(pattern):
         metadata = f.parent / f'{f.stem}.xlsx'
+        if metadata.is_file() and not force:
+            continue
         copy_file(template, metadata)
+        copied.append(metadata)
+    return copied
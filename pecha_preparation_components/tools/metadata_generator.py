@@ -0,0 +1,167 @@
+import csv
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from .. import instrumentation
+from ..raw_input_parsers.pecha_json import toh_key
+from ..raw_input_parsers.segment_store import parse_work_name
+
+# the rows and columns of the metadata template, see input/input_for_op_toolkit/*/*.csv
+METADATA_KEYS = ['author', 'composition_date', 'source', 'presentation', 'usage_title', 'title_short',
+                 'title_long_clean', 'title_alt_1', 'title_alt_2', 'is_commentary_of', 'is_version_of',
+                 'is_translation_of', 'lang']
+LANGS = ['BO', 'EN', 'ZH']
+SHEET = 'xl/worksheets/sheet1.xml'
+
+_template = None
+
+
+def text_metadata(text_file, titles=None):
+    """
+    what is known of a text exported by parse_cbeta_xml_triplets() from its path:
+    .../Toh0198_kp0016_<Chinese title>/Toh0198_kp0016_<Chinese title>_[simplified_]<lang>.docx
+    laid out as the files of input/input_for_op_toolkit: the Toh number in the EN column and in that of the text,
+    the title in the column of the text, the Tibetan title of a Chinese text in is_translation_of.
+    the Tibetan title is taken from titles, {Toh number: Tibetan title} from pecha_json.load_titles(). without it,
+    the BO title_short of Tibetan texts is left for the data team to fill in: until then parse_metadata_file()
+    can't name the text. the English titles are always left to them.
+    returns {key: {lang column: value}} with the keys of METADATA_KEYS
+    """
+    text_file = Path(text_file)
+    meta = {k: {} for k in METADATA_KEYS}
+    lang = text_file.stem.rsplit('_', 1)[-1].lower()
+    column = lang.upper() if lang.upper() in LANGS else 'EN'
+    work = parse_work_name(text_file.parent.name)
+    bo_title = (titles or {}).get(toh_key(work['toh'])) if work['toh'] else None
+    if work['toh']:
+        meta['presentation']['EN'] = meta['presentation'][column] = f'Toh{work["toh"]}'
+    if column == 'BO':
+        if bo_title:
+            meta['title_short']['BO'] = bo_title
+    else:
+        meta['title_short'][column] = work['title']
+        if bo_title:
+            meta['is_translation_of']['BO'] = bo_title
+    meta['lang'][column] = lang
+    return meta
+
+
+def rows(meta):
+    yield [None] + LANGS
+    for key in METADATA_KEYS:
+        yield [key] + [meta[key].get(lang) for lang in LANGS]
+
+
+def write_xlsx_openpyxl(out_file, meta):
+    from openpyxl import Workbook  # slow to import
+
+    # write-only workbooks are streamed to the file without keeping the cells in memory
+    wb = Workbook(write_only=True)
+    sheet = wb.create_sheet('root text')
+    for row in rows(meta):
+        sheet.append(row)
+    wb.save(out_file)
+
+
+def xlsx_template():
+    """
+    the parts of a workbook written by write_xlsx_openpyxl(), built once per process.
+    the sheet is split around its rows so that they can be written in between
+    """
+    global _template
+    if _template is None:
+        out = BytesIO()
+        write_xlsx_openpyxl(out, {k: {} for k in METADATA_KEYS})
+        with zipfile.ZipFile(out) as z:
+            parts = [(name, z.read(name)) for name in z.namelist()]
+        sheet = dict(parts)[SHEET].decode('utf-8')
+        start = sheet.index('<sheetData>') + len('<sheetData>')
+        end = sheet.index('</sheetData>')
+        _template = {'parts': parts, 'sheet': (sheet[:start], sheet[end:])}
+    return _template
+
+
+def column(num):
+    # 0 -> A, 25 -> Z, 26 -> AA
+    name = ''
+    num += 1
+    while num:
+        num, rest = divmod(num - 1, 26)
+        name = chr(65 + rest) + name
+    return name
+
+
+def escape(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def cell_xml(ref, value):
+    value = str(value)
+    space = ' xml:space="preserve"' if value != value.strip() else ''
+    return f'<c r="{ref}" t="inlineStr"><is><t{space}>{escape(value)}</t></is></c>'
+
+
+def sheet_rows_xml(meta):
+    # the cells as openpyxl writes them in write-only mode: strings inline, empty cells left out
+    out = []
+    for r, row in enumerate(rows(meta), start=1):
+        cells = ''.join(cell_xml(f'{column(c)}{r}', v) for c, v in enumerate(row) if v is not None)
+        out.append(f'<row r="{r}">{cells}</row>')
+    return ''.join(out)
+
+
+def write_xlsx(out_file, meta):
+    # the same workbook as write_xlsx_openpyxl(), only the sheet being written for each file
+    template = xlsx_template()
+    before, after = template['sheet']
+    with zipfile.ZipFile(out_file, 'w', zipfile.ZIP_DEFLATED) as z:
+        for name, data in template['parts']:
+            if name == SHEET:
+                data = (before + sheet_rows_xml(meta) + after).encode('utf-8')
+            z.writestr(name, data)
+
+
+def write_csv(out_file, meta):
+    with open(out_file, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f, lineterminator='\n').writerows(rows(meta))
+
+
+WRITERS = {'xlsx': write_xlsx, 'csv': write_csv}
+
+
+def write_metadata(text_file, out_file, fmt, titles=None):
+    WRITERS[fmt](out_file, text_metadata(text_file, titles))
+    return out_file
+
+
+def generate_metadata(folder, pattern='*.docx', fmt='xlsx', force=False, workers=1, titles=None):
+    """
+    writes a metadata file, prefilled with the Toh number, title and language found in the path, next to each text
+    of folder. it replaces the copies of the empty template made by recursive_copy_metadata().
+    fmt: "xlsx" or "csv"
+    titles: {Toh number: Tibetan title} from pecha_json.load_titles(), to also fill in the Tibetan titles
+    existing metadata files are kept unless force is set: they may have been filled in already.
+    workers: the number of threads writing the files. they only help when writing is slowed down by the disk, on
+    network or synced folders: on a local disk, xlsx files are written slower by several threads as they are
+    compressed while holding the GIL, and csv files no faster (benchmarks/bench_metadata.py). returns the written files
+    """
+    start = time.perf_counter()
+    todo = []
+    for f in Path(folder).rglob(pattern):
+        out_file = f.parent / f'{f.stem}.{fmt}'
+        if out_file.is_file() and not force:
+            continue
+        todo.append((f, out_file))
+
+    with instrumentation.stage('metadata_generation'):
+        if workers > 1 and len(todo) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                written = list(executor.map(lambda t: write_metadata(*t, fmt, titles), todo))
+        else:
+            written = [write_metadata(f, out_file, fmt, titles) for f, out_file in todo]
+    instrumentation.count('metadata_files', len(written))
+    print(f'{len(written)} metadata files written in {time.perf_counter() - start:.2f}s')
+    return written
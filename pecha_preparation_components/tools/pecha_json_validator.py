@@ -0,0 +1,355 @@
+"""
+checks pecha.org json files against the templates of docs/sample_files before they are ingested.
+
+the schemas are written in a small notation: str for a string, [spec] for a list of spec, {key: spec} for an object
+whose keys starting with "?" are optional, and SECTIONS for the nested sections of complex texts:
+{"<section title>": {"data": [str], "<sub-section title>": {...}}}.
+simple and complex texts have their schema, compiled once per process into nested check functions.
+errors are given as (json path, message), such as ('$.target.books[0].content["Section A"].data[3]', 'not a string')
+"""
+import json
+import re
+import time
+import traceback
+from itertools import islice
+from pathlib import Path
+
+from .. import instrumentation
+
+SECTIONS = 'sections'
+IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+# files found in the exported trees that are not texts
+NOT_TEXTS = {'catalog.json', 'manifest.json'}
+
+# the category of a commentary links it to its root text
+COMMENTARY_LINK = {'?base_text_titles': [str], '?base_text_mapping': str, '?link': str}
+SOURCE_CATEGORY = {'name': str, 'enDesc': str, 'enShortDesc': str, **COMMENTARY_LINK}
+# the complex text templates have the enDesc fields on both sides
+TARGET_CATEGORY = {'name': str, '?heDesc': str, '?heShortDesc': str, '?enDesc': str, '?enShortDesc': str,
+                   **COMMENTARY_LINK}
+CONTENT = {'simple': [[str]], 'complex': SECTIONS}
+# the segments of a commentary start with the section and segment numbers of the root text they comment: <1><5>
+ROOT_SEGMENT = re.compile(r'<[^<>\s]+><[^<>\s]+>')
+# not all of them do, an introduction for example, but the first ones do in the samples: only those are looked at
+ROOT_SEGMENTS_LOOKED_AT = 10
+
+
+def book(content):
+    return {'title': str, 'language': str, 'versionSource': str, 'content': content, '?completestatus': str,
+            '?direction': str}
+
+
+def text_schema(kind):
+    content = CONTENT[kind]
+    return {
+        'source': {'categories': [SOURCE_CATEGORY], 'books': [book(content)]},
+        'target': {'categories': [TARGET_CATEGORY], 'books': [book(content)]},
+    }
+
+
+# translations, versions and commentaries only differ by what the books hold, not by their schema
+SCHEMAS = {kind: text_schema(kind) for kind in CONTENT}
+
+_compiled = {}
+_catalog = None
+
+
+def jpath(path, key):
+    if isinstance(key, int):
+        return f'{path}[{key}]'
+    if IDENTIFIER.match(key):
+        return f'{path}.{key}'
+    return f'{path}[{json.dumps(key, ensure_ascii=False)}]'
+
+
+def compile_spec(spec):
+    # returns check(value, path, errors)
+    if spec is str:
+        def check(value, path, errors):
+            if not isinstance(value, str):
+                errors.append((path, f'expected a string, got {type(value).__name__}'))
+        return check
+
+    if spec == SECTIONS:
+        check_data = compile_spec([str])
+
+        def check(value, path, errors):
+            if not isinstance(value, dict):
+                errors.append((path, f'expected sections, got {type(value).__name__}'))
+                return
+            for title, section in value.items():
+                sub_path = jpath(path, title)
+                if not isinstance(section, dict):
+                    errors.append((sub_path, f'expected a section, got {type(section).__name__}'))
+                    continue
+                if 'data' not in section:
+                    errors.append((sub_path, 'missing "data"'))
+                else:
+                    check_data(section['data'], jpath(sub_path, 'data'), errors)
+                check({k: v for k, v in section.items() if k != 'data'}, sub_path, errors)
+        return check
+
+    if isinstance(spec, list):
+        check_item = compile_spec(spec[0])
+        only_strings = spec[0] is str
+
+        def check(value, path, errors):
+            if not isinstance(value, list):
+                errors.append((path, f'expected a list, got {type(value).__name__}'))
+                return
+            # the segments: checked at once, one by one only to find the wrong ones
+            if only_strings and all(isinstance(item, str) for item in value):
+                return
+            for num, item in enumerate(value):
+                check_item(item, f'{path}[{num}]', errors)
+        return check
+
+    if isinstance(spec, dict):
+        required = {k: compile_spec(v) for k, v in spec.items() if not k.startswith('?')}
+        optional = {k[1:]: compile_spec(v) for k, v in spec.items() if k.startswith('?')}
+
+        def check(value, path, errors):
+            if not isinstance(value, dict):
+                errors.append((path, f'expected an object, got {type(value).__name__}'))
+                return
+            for key, check_value in required.items():
+                if key not in value:
+                    errors.append((jpath(path, key), 'missing'))
+                else:
+                    check_value(value[key], jpath(path, key), errors)
+            for key, check_value in optional.items():
+                if key in value:
+                    check_value(value[key], jpath(path, key), errors)
+            for key in value:
+                if key not in required and key not in optional:
+                    errors.append((jpath(path, key), 'unexpected key'))
+        return check
+
+    raise ValueError(f'unknown schema: {spec!r}')
+
+
+def schema(kind):
+    if kind not in _compiled:
+        _compiled[kind] = compile_spec(SCHEMAS[kind])
+    return _compiled[kind]
+
+
+def books(doc, side):
+    try:
+        return [b for b in doc[side]['books'] if isinstance(b, dict)]
+    except (KeyError, TypeError):
+        return []
+
+
+def section_lengths(content, path='', position=()):
+    """
+    {position of each section: (json path of its segments, number of segments)}
+    sections are matched by position, as the section titles of translations and versions are translated too
+    """
+    out = {}
+    if isinstance(content, list):
+        for num, section in enumerate(content):
+            if isinstance(section, list):
+                out[position + (num,)] = (f'{path}[{num}]', len(section))
+    elif isinstance(content, dict):
+        subsections = [(t, s) for t, s in content.items() if isinstance(s, dict)]
+        for num, (title, section) in enumerate(subsections):
+            sub_path, sub_position = jpath(path, title), position + (num,)
+            if isinstance(section.get('data'), list):
+                out[sub_position] = (jpath(sub_path, 'data'), len(section['data']))
+            out.update(section_lengths({k: v for k, v in section.items() if k != 'data'}, sub_path, sub_position))
+    return out
+
+
+def is_empty(content):
+    return not any(length for _, length in section_lengths(content).values())
+
+
+def segments(content):
+    # the segments of a book, section by section
+    if isinstance(content, list):
+        for section in content:
+            if isinstance(section, list):
+                yield from section
+    elif isinstance(content, dict):
+        for section in content.values():
+            if isinstance(section, dict):
+                if isinstance(section.get('data'), list):
+                    yield from section['data']
+                yield from segments({k: v for k, v in section.items() if k != 'data'})
+
+
+def is_commentary(doc, main):
+    try:
+        categories = [c for side in ('source', 'target') for c in doc[side]['categories'] if isinstance(c, dict)]
+    except (KeyError, TypeError):
+        categories = []
+    if any(k in c for c in categories for k in ('link', 'base_text_titles')):
+        return True
+    first = islice((s for s in segments(main.get('content')) if isinstance(s, str) and s), ROOT_SEGMENTS_LOOKED_AT)
+    return any(ROOT_SEGMENT.match(s) for s in first)
+
+
+def template_type(doc):
+    """
+    simple texts have their content in a list of sections, complex texts in nested sections.
+    if the source books have content, they are translations of the target, otherwise several target books are
+    versions of the main text. a text of either kind, with or without translations or versions, is a commentary if
+    its categories link it to its root text or if its segments give the root segments they comment.
+    returns "<kind>[-translation|-version][-commentary]", or "<kind>-minimal" for a text with none of them
+    """
+    targets, sources = books(doc, 'target'), books(doc, 'source')
+    kind = 'complex' if targets and isinstance(targets[0].get('content'), dict) else 'simple'
+    parts = [kind]
+    if any(not is_empty(b.get('content')) for b in sources):
+        parts.append('translation')
+    elif len(targets) > 1:
+        parts.append('version')
+    if targets and is_commentary(doc, targets[0]):
+        parts.append('commentary')
+    return '-'.join(parts) if len(parts) > 1 else f'{kind}-minimal'
+
+
+def check_lengths(doc, errors):
+    """
+    translations (source books) and versions (target books after the first) must have as many segments as the main
+    text, in each section. commentaries can have both. books without any segment yet are left out
+    """
+    targets = books(doc, 'target')
+    if not targets:
+        return
+    main = section_lengths(targets[0].get('content'))
+    others = [('source', num, b) for num, b in enumerate(books(doc, 'source'))]
+    others += [('target', num, b) for num, b in enumerate(targets) if num]
+    others = [(side, num, b) for side, num, b in others if not is_empty(b.get('content'))]
+    for side, num, other in others:
+        prefix = f'$.{side}.books[{num}].content'
+        lengths = section_lengths(other.get('content'))
+        for position, (path, length) in main.items():
+            if position not in lengths:
+                errors.append((f'$.target.books[0].content{path}', f'section missing in {prefix}'))
+            elif lengths[position][1] != length:
+                errors.append((prefix + lengths[position][0], f'{lengths[position][1]} segments, '
+                                                              f'the main text has {length}'))
+        for position, (path, _) in lengths.items():
+            if position not in main:
+                errors.append((prefix + path, 'section not in the main text'))
+
+
+def catalog_paths(catalog):
+    # {tuple of the Tibetan category names: [names of each category in all languages]} of a parsed catalog.json
+    paths = {}
+
+    def walk(node, names, all_names):
+        for key, value in node.items():
+            if 'data' in key or not isinstance(value, dict):
+                continue
+            data = next((v for k, v in value.items() if 'data' in k and isinstance(v, dict)), {})
+            # the category name is the first field of the legend, as in pecha_json.format_categories()
+            cat_name = next((v for k, v in data.items() if k != 'works'), {}) or {}
+            cur = names + (cat_name.get('bo') or key,)
+            cur_all = all_names + [{v for v in cat_name.values() if v}]
+            paths[cur] = cur_all
+            walk(value, cur, cur_all)
+
+    walk(catalog, (), [])
+    return paths
+
+
+def check_categories(doc, paths, errors):
+    try:
+        target = [c.get('name') for c in doc['target']['categories']]
+        source = [c.get('name') for c in doc['source']['categories']]
+    except (KeyError, TypeError, AttributeError):
+        return  # reported by the schema
+    if tuple(target) not in paths:
+        errors.append(('$.target.categories', f'{" > ".join(map(str, target))} is not a category of the catalog'))
+        return
+    known = paths[tuple(target)]
+    if len(source) != len(target):
+        errors.append(('$.source.categories', f'{len(source)} categories, the target has {len(target)}'))
+        return
+    for num, (name, names) in enumerate(zip(source, known)):
+        if name not in names:
+            errors.append((f'$.source.categories[{num}].name', f'{name!r} is not a name of {target[num]} in the '
+                                                                  f'catalog'))
+
+
+def validate(doc, paths=None):
+    """
+    errors of a loaded pecha.org json document, as (json path, message), with the template type it was checked as.
+    paths: the categories of the catalog, as given by catalog_paths(), to also check the categories
+    """
+    if not isinstance(doc, dict):
+        return None, [('$', f'expected an object, got {type(doc).__name__}')]
+    text_type = template_type(doc)
+    errors = []
+    schema(text_type.split('-')[0])(doc, '$', errors)
+    check_lengths(doc, errors)
+    if paths is not None:
+        check_categories(doc, paths, errors)
+    return text_type, errors
+
+
+def load_catalog(catalog_file):
+    # once per process: in the parent, or in each worker as the initializer of the pool
+    global _catalog
+    _catalog = catalog_paths(json.loads(Path(catalog_file).read_text(encoding='utf-8'))) if catalog_file else None
+
+
+def validate_file(in_file):
+    start = time.perf_counter()
+    text_type, errors = None, []
+    try:
+        with open(in_file, encoding='utf-8') as f:
+            doc = json.load(f)
+        text_type, errors = validate(doc, _catalog)
+    except json.JSONDecodeError as e:
+        errors = [('$', f'invalid json: {e}')]
+    except Exception:
+        errors = [('$', traceback.format_exc())]
+    return {'file': in_file, 'type': text_type, 'errors': errors, 'time': time.perf_counter() - start}
+
+
+def find_texts(folder, pattern='*.json'):
+    return sorted(f for f in Path(folder).rglob(pattern) if f.name not in NOT_TEXTS)
+
+
+def report_validation(res):
+    status = f'{len(res["errors"])} errors' if res['errors'] else 'ok'
+    print(f'{status:>10}  {res["type"] or "":26} {res["file"]}')
+    for path, message in res['errors']:
+        print(f'\t{path}: {message}')
+
+
+def validate_tree(folder, catalog_file=None, pattern='*.json', workers=1, quiet=False):
+    """
+    validates all the json files of folder, except catalog.json and manifest.json, against the templates.
+    if a catalog.json from parse_catalog.py is given, the categories are checked against it.
+    quiet: only print the files that have errors
+    """
+    start = time.perf_counter()
+    files = find_texts(folder, pattern)
+    results = []
+    with instrumentation.stage('validation'):
+        if workers > 1 and len(files) > 1:
+            from concurrent.futures import ProcessPoolExecutor  # slow to import, and only needed here
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=load_catalog,
+                                     initargs=(catalog_file,)) as executor:
+                # small files: sent to the workers by batches
+                chunksize = max(1, min(64, len(files) // (workers * 4)))
+                results = list(executor.map(validate_file, files, chunksize=chunksize))
+        else:
+            load_catalog(catalog_file)
+            results = [validate_file(f) for f in files]
+    for res in results:
+        if res['errors'] or not quiet:
+            report_validation(res)
+
+    failed = [r for r in results if r['errors']]
+    instrumentation.count('validated_files', len(results))
+    instrumentation.count('invalid_files', len(failed))
+    print(f'{len(results) - len(failed)} of {len(results)} files valid, {sum(len(r["errors"]) for r in failed)} '
+          f'errors, in {time.perf_counter() - start:.1f}s')
+    return results
@@ -0,0 +1,49 @@
+from pathlib import Path
+import argparse
+import json
+
+from pecha_preparation_components import SegmentStore
+from pecha_preparation_components.raw_input_parsers.pecha_json import load_titles
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='query and export the segments saved by cbeta_xml_to_docx.py --store')
+    parser.add_argument('store', type=Path, help='the SQLite database of the segments')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('works', help='list the works')
+    search = sub.add_parser('search', help='find the segments containing a text')
+    search.add_argument('query')
+    search.add_argument('--lang', choices=['bo', 'zh'], help='both by default')
+    search.add_argument('--work')
+    search.add_argument('--limit', type=int, default=100)
+    export = sub.add_parser('export', help='export works to docx, and to pecha.org json if a catalog is given')
+    export.add_argument('works', nargs='*', help='all the works by default')
+    export.add_argument('--out-folder', type=Path, default=Path('output/Gold Standard'))
+    export.add_argument('--catalog', type=Path, help='catalog.json from parse_catalog.py')
+    export.add_argument('--metadata', type=Path,
+                        help='folder of the text metadata giving the Tibetan titles, the folder of the catalog by '
+                             'default')
+    args = parser.parse_args()
+    if not args.store.is_file():
+        parser.error(f'{args.store} does not exist, see cbeta_xml_to_docx.py --store')
+
+    # only read: a mistyped path must not create an empty database
+    with SegmentStore(args.store, read_only=True) as store:
+        if args.command == 'works':
+            for w in store.works():
+                print(f'{w["work"]}\t{w["variant"]}\tToh{w["toh"] or "-"}\tkp{w["kp"] or "-"}\t'
+                      f'{w["segments"]} segments')
+        elif args.command == 'search':
+            for r in store.search(args.query, lang=args.lang, work=args.work, limit=args.limit):
+                print(f'{r["work"]} ({r["variant"]}) {r["num"]}.\n\t{r["bo"]}\n\t{r["zh"]}')
+        else:
+            catalog, titles = None, None
+            if args.catalog:
+                catalog = json.loads(args.catalog.read_text(encoding='utf-8'))
+                titles = load_titles(args.metadata or args.catalog.parent)
+            works = [w for w in store.works() if not args.works or w['work'] in args.works]
+            for w in works:
+                out_files = store.export_docx(w['work'], args.out_folder, w['variant'])
+                if catalog is not None:
+                    out_files += store.export_pecha_json(w['work'], args.out_folder, catalog, titles, w['variant'])
+                print('\n'.join(str(f) for f in out_files))
@@ -0,0 +1,28 @@
+from pecha_preparation_components.raw_input_parsers.alignment import LinkTable
+
+
+def test_many_to_many_links():
+    links = [
+        ('1-1', ('1:1',), ('1:1',)),
+        ('2-1', ('2:1', '2:2'), ('2:1',)),
+        ('1-2', ('3:1',), ('3:1', '3:2')),
+        ('0-1', (), ('4:1',)),
+        ('1-1', ('9:9',), ('5:1',)),
+    ]
+    bo = {'1:1': 'ཀ།', '2:1': 'ཁ། ', '3:1': 'ག།', '3:2': 'ང།', '4:1': 'ཅ།', '5:1': 'ཆ།', '6:1': 'ཇ།'}
+    zh = {'1:1': '一', '2:1': '二', '2:2': '三', '3:1': '四', '7:1': '五'}
+
+    table = LinkTable(links)
+    assert table.link_ids(1, 'zh') == ['2:1', '2:2']
+    assert table.align(bo, zh) == [
+        ['ཀ།', '一'],
+        ['ཁ། ', '二三'],
+        ['ག། ང།', '四'],
+        ['ཅ།', ''],
+        ['ཆ།', ''],
+    ]
+
+    stats = table.coverage(bo, zh)
+    assert stats['types'] == {'1-1': 2, '2-1': 1, '1-2': 1, '0-1': 1}
+    assert stats['unaligned'] == {'bo': ['6:1'], 'zh': ['7:1']}
+    assert stats['dangling'] == {'bo': [], 'zh': ['9:9']}
@@ -26,4 +26,37 @@ def test_transfer_ann():
     ta = TransferAnnotations(origin, target)
     result = ta.transfer_segmentation()
     print('ok')
-    assert result == expected
\ No newline at end of file
+    assert result == expected
+
+def test_split_on_anchors():
+    from pecha_preparation_components.tools.ann_transfer import split_on_anchors
+
+    anns = [['segmentation', '(\n)'], ['chapters', r'(ch-[0-9]+ )']]
+    lines = [f'ch-{n} {n:03}་' + 'བདེ་གཤེགས་ཆོས་ཀྱི་སྐུ་མངའ་སྲས་བཅས་དང་། །ཕྱག་འོས་ཀུན་ལའང་གུས་པར་ཕྱག་འཚལ་ཏེ། །' * 3
+             for n in range(30)]
+    origin = '\n'.join(lines)
+    target = ''.join(line.split(' ', 1)[1] for line in lines)
+
+    chunks = split_on_anchors(origin, target, anns, 500)
+    assert len(chunks) > 1
+    assert ''.join(o for o, _ in chunks) == origin
+    assert ''.join(t for _, t in chunks) == target
+    # every chunk but the first starts with the same anchor in both texts
+    for o, t in chunks[1:]:
+        assert o[:32] == t[:32]
+
+
+def test_pair_files(tmp_path):
+    from pecha_preparation_components.tools.ann_transfer import pair_files
+
+    for path in ['seg/a/x segmented.txt', 'seg/y segmented.txt', 'seg/z segmented.txt',
+                 'clean/a/x clean.txt', 'clean/y clean.txt']:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text('')
+
+    pairs, missing = pair_files(tmp_path / 'seg', tmp_path / 'clean')
+    assert [(o.name, t.relative_to(tmp_path).as_posix(), r.as_posix()) for o, t, r in pairs] == [
+        ('x segmented.txt', 'clean/a/x clean.txt', 'a/x clean.txt'),
+        ('y segmented.txt', 'clean/y clean.txt', 'y clean.txt'),
+    ]
+    assert [m.name for m in missing] == ['z segmented.txt']
@@ -0,0 +1,104 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from pecha_preparation_components.catalog_parser.downloader import CatalogCache, CatalogDownloadError
+
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    content = b'catalog v1'
+    etag = '"v1"'
+    requests = []
+    failures = 0
+    status = None
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests.append(dict(self.headers))
+        if cls.failures or cls.status:
+            cls.failures = max(0, cls.failures - 1)
+            self.send_response(cls.status or 503)
+            self.end_headers()
+            return
+        if self.headers.get('If-None-Match') == cls.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        content = cls.content
+        if self.headers.get('Range') and self.headers.get('If-Range') == cls.etag:
+            start = int(self.headers['Range'].split('=')[1].rstrip('-'))
+            content = content[start:]
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(cls.content) - 1}/{len(cls.content)}')
+        else:
+            self.send_response(200)
+        self.send_header('ETag', cls.etag)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    CatalogHandler.content, CatalogHandler.etag, CatalogHandler.requests = b'catalog v1', '"v1"', []
+    CatalogHandler.failures, CatalogHandler.status = 0, None
+    httpd = HTTPServer(('127.0.0.1', 0), CatalogHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}/catalog.xlsx'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_conditional_download(server, tmp_path):
+    cache = CatalogCache(tmp_path)
+    assert cache.fetch(server).read_bytes() == b'catalog v1'
+    first_hash = cache.meta['sha256']
+
+    # unchanged: the server answers 304 and the cached copy is kept
+    assert cache.fetch(server).read_bytes() == b'catalog v1'
+    assert CatalogHandler.requests[-1]['If-None-Match'] == '"v1"'
+    assert cache.meta['sha256'] == first_hash
+
+    # offline: no request at all
+    count = len(CatalogHandler.requests)
+    assert CatalogCache(tmp_path).fetch(server, offline=True).read_bytes() == b'catalog v1'
+    assert len(CatalogHandler.requests) == count
+
+    # changed, after a temporary server error
+    CatalogHandler.content, CatalogHandler.etag, CatalogHandler.failures = b'catalog v2', '"v2"', 1
+    assert CatalogCache(tmp_path).fetch(server, backoff=0).read_bytes() == b'catalog v2'
+    assert cache.meta['sha256'] != CatalogCache(tmp_path).meta['sha256']
+
+
+def test_refused_download_is_not_retried(server, tmp_path):
+    cache = CatalogCache(tmp_path)
+    cache.fetch(server)
+    CatalogHandler.content, CatalogHandler.etag, CatalogHandler.status = b'catalog v2', '"v2"', 404
+    count = len(CatalogHandler.requests)
+    # neither retried nor replaced by the stale cached catalog
+    with pytest.raises(CatalogDownloadError) as e:
+        cache.fetch(server, backoff=0)
+    assert e.value.status == 404
+    assert len(CatalogHandler.requests) == count + 1
+
+
+def test_resume_interrupted_download(server, tmp_path):
+    CatalogHandler.content = b'a catalog downloaded in two parts'
+    cache = CatalogCache(tmp_path)
+    cache.part.write_bytes(b'a catalog ')
+    cache.meta['part_etag'] = '"v1"'
+    assert cache.fetch(server).read_bytes() == b'a catalog downloaded in two parts'
+    assert CatalogHandler.requests[-1]['Range'] == 'bytes=10-'
+    assert CatalogHandler.requests[-1]['If-Range'] == '"v1"'
+    assert not cache.part.exists() and cache.meta['part_etag'] is None
+
+    # the catalog changed since the partial download: the server sends it whole
+    CatalogHandler.content, CatalogHandler.etag = b'catalog v2', '"v2"'
+    cache.part.write_bytes(b'a catalog ')
+    cache.meta['part_etag'] = '"v1"'
+    assert cache.fetch(server).read_bytes() == b'catalog v2'
@@ -0,0 +1,17 @@
+from pecha_preparation_components.catalog_parser.catalog_index import CatalogIndex
+
+
+def test_catalog_index():
+    # filled as walk_ontology() fills it
+    index = CatalogIndex()
+    index.add_work('title_a', 'uuid_a', ('མདོ།',))
+    index.add_work('title_b', 'uuid_b', ('མདོ།', 'ཤེར་ཕྱིན།'))
+    index.add_work('title_c', 'uuid_c', ('མདོ།', 'ཤེར་ཕྱིན།'))
+    index.add_uncategorized('title_d')
+
+    assert index.find_work('title_b') == 'uuid_b'
+    assert index.find_work('title_d') is None
+    assert index.category_path('uuid_c') == ['མདོ།', 'ཤེར་ཕྱིན།']
+    assert index.works_in('ཤེར་ཕྱིན།') == [('title_b', 'uuid_b'), ('title_c', 'uuid_c')]
+    assert index.works_in(['མདོ།']) == [('title_a', 'uuid_a')]
+    assert index.uncategorized == {'title_d'}
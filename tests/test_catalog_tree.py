@@ -0,0 +1,48 @@
+from pecha_preparation_components.catalog_parser.catalog_manager import walk_ontology
+
+
+class Node:
+    # the parts of a leavedonto trie node that are used
+    def __init__(self, children=None, data=None):
+        self.children = children or {}
+        self.data = data
+
+
+def leaf(rows):
+    return Node(data=rows)
+
+
+class Ont:
+    legend = ['lang', 'cat_name', 'description', 'short_description', 'work', 'uuid']
+
+    def __init__(self, head):
+        self.head = head
+
+
+def test_walk_ontology():
+    ont = Ont(Node({
+        'མདོ།': Node({
+            'data': leaf([['bo', 'མདོ།', 'ཀ', 'ཁ', 'title_a', 'uuid_a'], ['en', 'Sutra', 'd', 's', '', '']]),
+            'ཤེར་ཕྱིན།': Node({
+                'data': leaf([['bo', 'ཤེར་ཕྱིན།', 'ག', 'ང', 'title_b', 'uuid_b'],
+                              ['', '', '', '', 'title_c', 'uuid_c']]),
+            }),
+        }),
+        'Uncategorized': leaf([['', '', '', '', 'title_d', 'uuid_d']]),
+    }))
+    index, cats_meta, catalog = walk_ontology(ont)
+
+    assert index.category_path('uuid_c') == ['མདོ།', 'ཤེར་ཕྱིན།']
+    assert index.uncategorized == {'title_d'}
+    assert cats_meta['མདོ།'] == {'bo': {'cat_name': 'མདོ།', 'description': 'ཀ', 'short_description': 'ཁ'},
+                                'en': {'cat_name': 'Sutra', 'description': 'd', 'short_description': 's'}}
+    assert catalog == {
+        'མདོ།': {
+            'data': {'cat_name': {'bo': 'མདོ།', 'en': 'Sutra'}, 'description': {'bo': 'ཀ', 'en': 'd'},
+                     'short_description': {'bo': 'ཁ', 'en': 's'}, 'works': [('title_a', 'uuid_a')]},
+            'ཤེར་ཕྱིན།': {
+                'data': {'cat_name': {'bo': 'ཤེར་ཕྱིན།'}, 'description': {'bo': 'ག'}, 'short_description': {'bo': 'ང'},
+                         'works': [('title_b', 'uuid_b'), ('title_c', 'uuid_c')]},
+            },
+        },
+    }
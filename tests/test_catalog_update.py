@@ -0,0 +1,75 @@
+from openpyxl import Workbook, load_workbook
+
+from pecha_preparation_components.catalog_parser.catalog_index import CatalogIndex
+from pecha_preparation_components.catalog_parser.catalog_manager import CatalogManager, append_uncategorized
+
+LEGEND = ['lang', 'cat_name', 'description', 'short_description', 'work', 'uuid']
+
+
+def make_catalog(out_file, uncategorized=True):
+    wb = Workbook()
+    wb.active.title = 'མདོ།'
+    wb.active.append(LEGEND)
+    wb.active.append(['bo', 'མདོ།', 'ཀ', 'ཁ', 'title_a', 'uuid_a'])
+    if uncategorized:
+        sheet = wb.create_sheet('Uncategorized')
+        sheet.append(LEGEND)
+        sheet.append(['', '', '', '', 'title_b', 'uuid_b'])
+    wb.save(out_file)
+    return out_file
+
+
+def rows(xlsx_file, sheet):
+    wb = load_workbook(xlsx_file, read_only=True)
+    out = [list(r) for r in wb[sheet].iter_rows(values_only=True)]
+    wb.close()
+    return out
+
+
+def test_append_uncategorized(tmp_path):
+    cat = make_catalog(tmp_path / 'catalog.xlsx')
+    before = rows(cat, 'མདོ།')
+    assert append_uncategorized(cat, LEGEND, [('title_c', 'uuid_c'), ('title_d', 'uuid_d')])
+    assert [r[4:] for r in rows(cat, 'Uncategorized')] == [['work', 'uuid'], ['title_b', 'uuid_b'],
+                                                          ['title_c', 'uuid_c'], ['title_d', 'uuid_d']]
+    assert rows(cat, 'མདོ།') == before
+    assert [f.name for f in tmp_path.iterdir()] == ['catalog.xlsx']
+
+
+def test_append_uncategorized_no_sheet(tmp_path):
+    cat = make_catalog(tmp_path / 'catalog.xlsx', uncategorized=False)
+    content = cat.read_bytes()
+    assert not append_uncategorized(cat, LEGEND, [('title_c', 'uuid_c')])
+    assert cat.read_bytes() == content
+
+
+class Onto:
+    # the parts of a LeavedOnto that are used
+    def __init__(self, ont_path):
+        self.ont_path = ont_path
+        self.exported = False
+        self.ont = type('Ont', (), {'legend': LEGEND})()
+        self.ont.head = type('Node', (), {})()
+        self.ont.head.children = {'Uncategorized': type('Node', (), {'data': []})()}
+
+    def convert2xlsx(self, folder):
+        self.exported = True
+
+
+def test_include_new_texts_report(tmp_path):
+    cm = CatalogManager.__new__(CatalogManager)
+    cm.index = CatalogIndex()
+    cm.index.add_work('title_a', 'uuid_a', ('མདོ།',))
+    cm.index.add_uncategorized('title_b')
+    cm.current_texts = {'title_a': {}, 'title_b': {}, 'title_c': {}}
+    cm.onto = Onto(make_catalog(tmp_path / 'catalog.xlsx'))
+
+    assert cm.include_new_texts(tmp_path, report_file=tmp_path / 'report.json')
+    report = cm.last_report
+    assert report['duplicates'] == [{'title': 'title_a', 'uuid': 'uuid_a', 'category': ['མདོ།']}]
+    assert report['already_uncategorized'] == ['title_b']
+    assert [n['title'] for n in report['new']] == ['title_c']
+    assert report['saved'] == 'append' and not cm.onto.exported
+    assert rows(cm.onto.ont_path, 'Uncategorized')[-1][4:] == ['title_c', report['new'][0]['uuid']]
+    assert (tmp_path / 'report.json').is_file()
+    assert not cm.include_new_texts(tmp_path)
@@ -0,0 +1,21 @@
+import zipfile
+
+from pecha_preparation_components.raw_input_parsers.parse_cbeta_xml_triplets import write_documents
+
+
+def test_fast_writer_matches_python_docx(tmp_path):
+    aligned = [
+        ['ཀ། ', '一^1[注一]二^2[a < b & c]'],
+        ['ཁ།\tག།', '^3[開頭]三'],
+        ['', '四^4[結尾]'],
+        ['ང།', '五^六'],
+        ['ཅ།', ''],
+    ]
+    slow = write_documents(tmp_path / 'slow', 'work', 'trad', aligned)
+    fast = write_documents(tmp_path / 'fast', 'work', 'trad', aligned, fast=True)
+    for a, b in zip(slow, fast):
+        assert a.name == b.name
+        with zipfile.ZipFile(a) as za, zipfile.ZipFile(b) as zb:
+            assert sorted(za.namelist()) == sorted(zb.namelist())
+            for name in za.namelist():
+                assert za.read(name) == zb.read(name), name
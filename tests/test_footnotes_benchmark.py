@@ -0,0 +1,54 @@
+import re
+import time
+
+from pecha_preparation_components.raw_input_parsers import parse_cbeta_2_pecha, parse_cbeta_2_pecha_batch
+
+
+def legacy_parse_cbeta_2_pecha(text):
+    # the implementation parse_cbeta_2_pecha had before the single-pass rewrite
+    pattern_whole = r'(\^[0-9]+\[[^\]]+\])'
+    pattern_split = r'\^([0-9]+)\[([^\]]+)\]'
+
+    out = []
+    parts = re.split(pattern_whole, text)
+    for p in parts:
+        if p.startswith('^') and '[' in p and p.endswith(']'):
+            _, marker, text, _ = re.split(pattern_split, p)
+            parsed = f'<sup class="footnote-marker">{marker}</sup><i class="footnote">{text}</i>'
+            out.append(parsed)
+        else:
+            out.append(p)
+
+    return ''.join(out)
+
+
+SEGMENTS = [
+    'this is a text with ^1[note one] and ^2[note 2]',
+    '^3[note 3]There is a note at the beginning!',
+    '如是我聞：一時，',
+    '「善逝法主^2[法主：原文寫做ཆོས་ཀྱི་རྗེ，梵文為dharma-svāmin。]」頂禮^13[【初稿】三寶]三寶。',
+    'a caret ^ without a note',
+]
+
+
+def throughput(func, segments, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(segments)
+    return len(segments) * repeat / (time.perf_counter() - start)
+
+
+def test_batch_matches_legacy():
+    expected = [legacy_parse_cbeta_2_pecha(s) for s in SEGMENTS]
+    assert [parse_cbeta_2_pecha(s) for s in SEGMENTS] == expected
+    assert list(parse_cbeta_2_pecha_batch(SEGMENTS)) == expected
+    assert list(parse_cbeta_2_pecha_batch(iter(SEGMENTS))) == expected
+
+
+def test_footnotes_throughput():
+    segments = SEGMENTS * 1000
+    legacy = throughput(lambda segs: [legacy_parse_cbeta_2_pecha(s) for s in segs], segments, 3)
+    single = throughput(lambda segs: [parse_cbeta_2_pecha(s) for s in segs], segments, 3)
+    batch = throughput(lambda segs: list(parse_cbeta_2_pecha_batch(segs)), segments, 3)
+    print(f'\nsegments/s: legacy {legacy:,.0f}, parse_cbeta_2_pecha {single:,.0f}, batch {batch:,.0f}')
+    assert list(parse_cbeta_2_pecha_batch(segments)) == [legacy_parse_cbeta_2_pecha(s) for s in segments]
@@ -0,0 +1,40 @@
+import json
+
+from pecha_preparation_components import instrumentation
+
+
+def test_disabled_by_default():
+    assert not instrumentation.enabled()
+    with instrumentation.stage('nothing'):
+        instrumentation.count('nothing')
+    report = instrumentation.report()
+    assert report['stages'] == {} and report['counters'] == {}
+    assert instrumentation.worker_settings() is None
+
+
+def test_stages_counters_and_merge(tmp_path):
+    @instrumentation.timed('double')
+    def double(x):
+        return 2 * x
+
+    instrumentation.enable(profile_dir=tmp_path / 'prof')
+    try:
+        with instrumentation.stage('outer'):
+            assert double(2) == 4
+            instrumentation.count('items', 3)
+        assert list(instrumentation.timed_iter('iter', range(3))) == [0, 1, 2]
+        instrumentation.merge({'stages': {'outer': {'calls': 2, 'seconds': 1.0}}, 'counters': {'items': 1},
+                               'pid': 1})
+        # a second task run by the same worker process
+        instrumentation.merge({'stages': {}, 'counters': {}, 'pid': 1})
+
+        out = instrumentation.save_report(tmp_path / 'report.json')
+        report = json.loads(out.read_text())
+        assert report['workers'] == 1 and report['tasks'] == 2
+        assert {k: v['calls'] for k, v in report['stages'].items()} == {'double': 1, 'iter': 4, 'outer': 3}
+        assert report['stages']['outer']['seconds'] >= 1.0
+        assert report['counters'] == {'items': 4}
+        # only the outermost stages are profiled
+        assert sorted(f.name for f in (tmp_path / 'prof').iterdir()) == ['iter.prof', 'outer.prof']
+    finally:
+        instrumentation.disable()
@@ -0,0 +1,43 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+HEAVY = ['openpyxl', 'yaml', 'urllib3', 'docx', 'antx', 'lxml']
+
+
+def loaded_after(code):
+    # runs code in a fresh interpreter and returns the heavy dependencies it loaded
+    script = f'import sys, json\n{code}\nprint(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))'
+    out = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                         cwd=Path(__file__).parent.parent)
+    return json.loads(out.stdout.splitlines()[-1])
+
+
+def test_package_import_is_light():
+    assert loaded_after('import pecha_preparation_components') == []
+
+
+def test_footnotes_only_load_what_they_need():
+    code = ('from pecha_preparation_components import parse_cbeta_2_pecha\n'
+            'assert parse_cbeta_2_pecha("a^1[b]") == '
+            '\'a<sup class="footnote-marker">1</sup><i class="footnote">b</i>\'')
+    assert loaded_after(code) == []
+
+
+def test_heavy_dependencies_load_on_first_use(tmp_path):
+    code = ('import pecha_preparation_components as ppc\n'
+            'from pecha_preparation_components.tools import copy_file\n'
+            'assert "TransferAnnotations" in dir(ppc)\n'
+            'assert "docx" not in sys.modules\n'
+            'from pecha_preparation_components.raw_input_parsers.parse_cbeta_xml_triplets import write_documents\n'
+            f'write_documents(__import__("pathlib").Path({str(tmp_path)!r}), "work", "trad", [["a", "b"]])')
+    assert 'docx' in loaded_after(code)
+
+
+def test_unknown_names_raise_attribute_errors():
+    code = ('import pecha_preparation_components.tools as tools\n'
+            'assert not hasattr(tools, "nothing")\n'
+            'assert "generate_metadata" in dir(tools) and "generate_metadata" not in vars(tools)\n'
+            'assert tools.generate_metadata is vars(tools)["generate_metadata"]')
+    assert 'lxml' not in loaded_after(code)
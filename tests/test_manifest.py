@@ -0,0 +1,25 @@
+from pecha_preparation_components.raw_input_parsers.manifest import BuildManifest, hash_files
+
+
+def test_manifest(tmp_path):
+    in_file = tmp_path / 'a.bo.xml'
+    out_file = tmp_path / 'a_bo.docx'
+    in_file.write_text('<text/>')
+    out_file.write_text('docx')
+
+    manifest = BuildManifest(tmp_path / 'manifest.json')
+    assert not manifest.is_current('a', hash_files([in_file]))
+    manifest.record('a', hash_files([in_file]), [out_file])
+    manifest.save()
+
+    manifest = BuildManifest(tmp_path / 'manifest.json')
+    assert manifest.is_current('a', hash_files([in_file]))
+
+    # changed output
+    out_file.write_text('edited')
+    assert not manifest.is_current('a', hash_files([in_file]))
+
+    # changed input
+    manifest.record('a', hash_files([in_file]), [out_file])
+    in_file.write_text('<text></text>')
+    assert not manifest.is_current('a', hash_files([in_file]))
@@ -0,0 +1,38 @@
+from pecha_preparation_components.catalog_parser.catalog_manager import parse_metadata_file
+from pecha_preparation_components.tools.metadata_generator import generate_metadata
+
+
+def test_generate_metadata(tmp_path):
+    work = tmp_path / 'Toh0225_kp0021_聖三歸依'
+    work.mkdir()
+    for lang in ['bo', 'zh', 'simplified_zh']:
+        (work / f'Toh0225_kp0021_聖三歸依_{lang}.docx').write_bytes(b'')
+
+    written = generate_metadata(tmp_path, fmt='xlsx', workers=2)
+    assert sorted(f.name for f in written) == ['Toh0225_kp0021_聖三歸依_bo.xlsx', 'Toh0225_kp0021_聖三歸依_simplified_zh.xlsx',
+                                               'Toh0225_kp0021_聖三歸依_zh.xlsx']
+    meta = parse_metadata_file(work / 'Toh0225_kp0021_聖三歸依_zh.xlsx')['']
+    assert meta['other']['type'] == 'root_text'
+    assert meta['presentation'] == {'BO': None, 'EN': 'Toh0225', 'ZH': 'Toh0225'}
+    assert meta['title_short'] == {'BO': None, 'EN': None, 'ZH': '聖三歸依'}
+    assert meta['lang'] == {'BO': None, 'EN': None, 'ZH': 'zh'}
+
+    # existing files are kept
+    assert generate_metadata(tmp_path, fmt='xlsx') == []
+    assert len(generate_metadata(tmp_path, fmt='xlsx', force=True)) == 3
+
+    # the layout of input/input_for_op_toolkit/Toh 0225/*.csv, with the Tibetan title when it is known
+    generate_metadata(tmp_path, fmt='csv', workers=1, titles={'225': 'གསུམ་ལ་སྐྱབས་སུ་འགྲོ་བའི་མདོ།'})
+    lines = (work / 'Toh0225_kp0021_聖三歸依_bo.csv').read_text(encoding='utf-8').splitlines()
+    assert lines[0] == ',BO,EN,ZH'
+    assert 'presentation,Toh0225,Toh0225,' in lines
+    assert 'title_short,གསུམ་ལ་སྐྱབས་སུ་འགྲོ་བའི་མདོ།,,' in lines
+    assert lines[-1] == 'lang,bo,,'
+    lines = (work / 'Toh0225_kp0021_聖三歸依_zh.csv').read_text(encoding='utf-8').splitlines()
+    assert 'presentation,,Toh0225,Toh0225' in lines
+    assert 'title_short,,,聖三歸依' in lines
+    assert 'is_translation_of,གསུམ་ལ་སྐྱབས་སུ་འགྲོ་བའི་མདོ།,,' in lines
+
+    # the Tibetan texts are then named by their title
+    generate_metadata(tmp_path, force=True, titles={'225': 'གསུམ་ལ་སྐྱབས་སུ་འགྲོ་བའི་མདོ།'})
+    assert list(parse_metadata_file(work / 'Toh0225_kp0021_聖三歸依_bo.xlsx')) == ['གསུམ་ལ་སྐྱབས་སུ་འགྲོ་བའི་མདོ།']
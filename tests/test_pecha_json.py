@@ -0,0 +1,92 @@
+import json
+
+from pecha_preparation_components.raw_input_parsers.pecha_json import export_pecha_json, find_categories
+
+
+catalog = {
+    'མདོ།': {
+        'data': {'cat_name': {'bo': 'མདོ།', 'en': 'Sutra'}, 'desc': {'bo': 'ཀ', 'en': 'd'},
+                 'short_desc': {'bo': 'ཁ', 'en': 's'}, 'works': [['གཞན།', 'uuid1']]},
+        'ཤེར་ཕྱིན།': {
+            'data': {'cat_name': {'bo': 'ཤེར་ཕྱིན།', 'en': 'Prajnaparamita'}, 'desc': {'bo': None, 'en': 'd2'},
+                     'short_desc': {'bo': '', 'en': 's2'}, 'works': [['ཤེས་རབ་སྙིང་པོ།', 'uuid2']]},
+        },
+    },
+}
+
+
+def test_find_categories():
+    path = find_categories(catalog, 'ཤེས་རབ་སྙིང་པོ།')
+    assert [c['cat_name']['en'] for c in path] == ['Sutra', 'Prajnaparamita']
+    assert find_categories(catalog, 'missing') == []
+
+
+def test_export_pecha_json(tmp_path):
+    aligned = [['ཀ།', '一^1[注]'], ['ཁ།', '"二"'], ['ག།', '']]
+    out = export_pecha_json(tmp_path / 'out.json', aligned, catalog, 'ཤེས་རབ་སྙིང་པོ།', '心經')
+    dump = json.loads(out.read_text(encoding='utf-8'))
+
+    source, target = dump['source'], dump['target']
+    assert source['categories'][1] == {'name': 'Prajnaparamita', 'enDesc': 'd2', 'enShortDesc': 's2'}
+    assert target['categories'][1] == {'name': 'ཤེར་ཕྱིན།', 'heDesc': '', 'heShortDesc': ''}
+    assert source['books'][0]['language'] == 'zh'
+    assert source['books'][0]['content']['心經']['data'] == [
+        '一<sup class="footnote-marker">1</sup><i class="footnote">注</i>', '"二"', '']
+    assert target['books'][0]['title'] == 'ཤེས་རབ་སྙིང་པོ།'
+    assert target['books'][0]['content']['心經']['data'] == ['ཀ།', 'ཁ།', 'ག།']
+
+
+def write_work(folder, name, sentences):
+    # a CBETA xml triplet with one link per sentence
+    folder.mkdir(parents=True)
+    for lang in ['bo', 'zh']:
+        body = ''.join(f'<s id="{n}">{s[lang]}</s>' for n, s in enumerate(sentences, start=1))
+        (folder / f'{name}.{lang}.xml').write_text(f'<text>{body}</text>', encoding='utf-8')
+    links = ''.join(f'<link type="1-1" xtargets="{n};{n}"/>' for n in range(1, len(sentences) + 1))
+    (folder / f'{name}.bo.zh.xml').write_text(f'<linkGrp>{links}</linkGrp>', encoding='utf-8')
+
+
+def test_write_pecha_json_from_the_toh_number(tmp_path):
+    from openpyxl import Workbook
+
+    from pecha_preparation_components.raw_input_parsers.parse_cbeta_xml_triplets import parse_cbeta_xml_triplets
+    from pecha_preparation_components.tools.pecha_json_validator import validate_tree
+
+    in_folder, out_folder, catalog_folder = tmp_path / 'in', tmp_path / 'out', tmp_path / 'catalog'
+    write_work(in_folder / 'Toh0021_kp0001_心經', 'heart', [{'bo': 'ཀ།', 'zh': '一^1[注]'}, {'bo': 'ཁ།', 'zh': '二'}])
+    write_work(in_folder / 'Toh0999_kp0002_無經', 'missing', [{'bo': 'ག།', 'zh': '三'}])
+    catalog_folder.mkdir()
+    (catalog_folder / 'catalog.json').write_text(json.dumps(catalog, ensure_ascii=False), encoding='utf-8')
+
+    def write_metadata(name, toh, title):
+        wb = Workbook()
+        wb.active.title = 'root text'
+        for row in [[None, 'BO', 'EN', 'ZH'], ['presentation', toh, toh, None], ['title_short', title, None, None]]:
+            wb.active.append(row)
+        wb.save(catalog_folder / f'{name}.xlsx')
+
+    def rebuilt():
+        results = parse_cbeta_xml_triplets(in_folder, out_folder, catalog_file=catalog_folder / 'catalog.json',
+                                           fast_docx=True)
+        return {r['work'][:7]: r for r in results}
+
+    write_metadata('heart', 'Toh021', 'ཤེས་རབ་སྙིང་པོ།')
+    results = rebuilt()
+    found, missing = results['Toh0021'], results['Toh0999']
+    assert not found['error']
+    dump = json.loads(found['out_files'][-1].read_text(encoding='utf-8'))
+    assert dump['target']['books'][0]['title'] == 'ཤེས་རབ་སྙིང་པོ།'
+    assert dump['source']['books'][0]['title'] == '心經'
+    assert [c['name'] for c in dump['target']['categories']] == ['མདོ།', 'ཤེར་ཕྱིན།']
+    # a work that can't be found gets its docx, but no json without a title and categories
+    assert not missing['error']
+    assert missing['json_error'] == 'Toh0999 is in none of the text metadata files'
+    assert [f.suffix for f in missing['out_files']] == ['.docx', '.docx']
+    assert [r['errors'] for r in validate_tree(out_folder, catalog_folder / 'catalog.json')] == [[]]
+
+    # only the works whose title or categories changed are rebuilt
+    write_metadata('other', 'Toh0500', 'ཐ།')
+    assert rebuilt() == {}
+    write_metadata('missing', 'Toh0999', 'གཞན།')
+    results = rebuilt()
+    assert list(results) == ['Toh0999'] and not results['Toh0999']['json_error']
@@ -0,0 +1,72 @@
+import json
+from pathlib import Path
+
+from pecha_preparation_components.raw_input_parsers.pecha_json import export_pecha_json
+from pecha_preparation_components.tools.pecha_json_validator import catalog_paths, validate, validate_tree
+
+SAMPLES = Path(__file__).parent.parent / 'docs' / 'sample_files'
+catalog = {
+    'མདོ།': {
+        'data': {'cat_name': {'bo': 'མདོ།', 'en': 'Sutra'}, 'desc': {'bo': 'ཀ', 'en': 'd'},
+                 'short_desc': {'bo': 'ཁ', 'en': 's'}, 'works': [['ཤེས་རབ་སྙིང་པོ།', 'uuid1']]},
+    },
+}
+
+
+# examples 5 and 7 are commentaries too: their categories link them to their root text, as that of example 4
+SAMPLE_TYPES = {
+    'example_1_simple-text.json': 'simple-minimal',
+    'example_2_simple-text_with_translation.json': 'simple-translation',
+    'example_3_simple-text_with_version.json': 'simple-version',
+    'example_4_simple-text_commentary.json': 'simple-commentary',
+    'example_5_complex-text.json': 'complex-commentary',
+    'example_7_complex-text_with_version.json': 'complex-version-commentary',
+    'template_1_simple-text_minimal.json': 'simple-minimal',
+    'template_2_simple-text_with_translation.json': 'simple-translation',
+    'template_3_simple-text_with_version.json': 'simple-version',
+    'template_4_simple-text_commentary.json': 'simple-commentary',
+    'template_5_complex-text_minimal.json': 'complex-minimal',
+    'template_6_complex-text_with_translation.json': 'complex-translation',
+    'template_7_complex-text_with_version.json': 'complex-version',
+    'template_8_complex-text_with_commentary.json': 'complex-commentary',
+}
+
+
+def test_sample_files_are_valid():
+    assert sorted(f.name for f in SAMPLES.glob('*.json')) == sorted(SAMPLE_TYPES)
+    for f in sorted(SAMPLES.glob('*.json')):
+        doc = json.loads(f.read_text(encoding='utf-8'))
+        assert validate(doc) == (SAMPLE_TYPES[f.name], []), f
+
+
+def test_validate(tmp_path):
+    aligned = [['ཀ།', '一'], ['ཁ།', '二']]
+    out = export_pecha_json(tmp_path / 'out.json', aligned, catalog, 'ཤེས་རབ་སྙིང་པོ།', '心經')
+    doc = json.loads(out.read_text(encoding='utf-8'))
+    paths = catalog_paths(catalog)
+    assert validate(doc, paths) == ('complex-translation', [])
+
+    doc['source']['books'][0]['content']['心經']['data'].append('三')
+    doc['target']['books'][0]['content']['心經']['data'][0] = 1
+    del doc['target']['books'][0]['title']
+    doc['target']['categories'][0]['name'] = 'རྒྱུད།'
+    _, errors = validate(doc, paths)
+    assert errors == [
+        ('$.target.books[0].title', 'missing'),
+        ('$.target.books[0].content["心經"].data[0]', 'expected a string, got int'),
+        ('$.source.books[0].content["心經"].data', '3 segments, the main text has 2'),
+        ('$.target.categories', 'རྒྱུད། is not a category of the catalog'),
+    ]
+
+
+def test_validate_tree(tmp_path):
+    for n in range(4):
+        export_pecha_json(tmp_path / f'work{n}' / f'work{n}_pecha.json', [['ཀ།', '一']], catalog, 'ཤེས་རབ་སྙིང་པོ།',
+                          '心經')
+    (tmp_path / 'work3' / 'work3_pecha.json').write_text('{"source": ', encoding='utf-8')
+    (tmp_path / 'catalog.json').write_text(json.dumps(catalog, ensure_ascii=False), encoding='utf-8')
+
+    results = validate_tree(tmp_path, catalog_file=tmp_path / 'catalog.json', workers=2)
+    assert [r['file'].name for r in results] == [f'work{n}_pecha.json' for n in range(4)]
+    assert [bool(r['errors']) for r in results] == [False, False, False, True]
+    assert results[3]['errors'][0][1].startswith('invalid json')
@@ -0,0 +1,63 @@
+from pecha_preparation_components.raw_input_parsers.segment_store import SegmentStore, parse_work_name
+
+
+def test_parse_work_name():
+    assert parse_work_name('Toh0198_kp0016_大乘經') == {'toh': '0198', 'kp': '0016', 'title': '大乘經'}
+    assert parse_work_name('大乘經') == {'toh': None, 'kp': None, 'title': '大乘經'}
+
+
+def test_segment_store(tmp_path):
+    segments = [
+        ('t-001', 'བཀྲ་ཤིས་བདེ་ལེགས།', '如是我聞^1[一本作聞如是]。', ['1:1'], ['1:1', '1:2']),
+        ('t-001', 'སངས་རྒྱས།', '一時佛在舍衛國。', ['1:2'], ['2:1']),
+        ('t-002', 'ཆོས།', '', ['1:1'], []),
+    ]
+    with SegmentStore(tmp_path / 'segments.db') as store:
+        store.add_work('Toh0198_kp0016_大乘經', 'trad', segments)
+        store.add_work('Toh0199_kp0017_心經', 'trad', [('t-003', 'ཤེས་རབ།', '舍衛國祇樹。', ['1:1'], ['1:1'])])
+        # adding a work again replaces it
+        store.add_work('Toh0198_kp0016_大乘經', 'trad', segments)
+
+        assert [(w['work'], w['toh'], w['segments']) for w in store.works()] == [
+            ('Toh0198_kp0016_大乘經', '0198', 3), ('Toh0199_kp0017_心經', '0199', 1)]
+        assert store.has_work('Toh0198_kp0016_大乘經') and not store.has_work('Toh0198_kp0016_大乘經', 'simp')
+
+        segs = store.segments('Toh0198_kp0016_大乘經')
+        assert [s['num'] for s in segs] == [1, 2, 3]
+        assert segs[0]['zh_text'] == '如是我聞。'
+        assert segs[0]['zh_ids'] == ['1:1', '1:2']
+        assert segs[0]['footnotes'] == [{'marker': '1', 'note': '一本作聞如是'}]
+        assert store.aligned('Toh0198_kp0016_大乘經') == [[s[1], s[2]] for s in segments]
+
+        assert [(r['work'], r['num']) for r in store.search('舍衛國')] == [('Toh0198_kp0016_大乘經', 2),
+                                                                        ('Toh0199_kp0017_心經', 1)]
+        assert len(store.search('舍衛國', work='Toh0199_kp0017_心經')) == 1
+        # footnotes are not searched, short queries scan the segments
+        assert store.search('一本作') == []
+        assert [r['num'] for r in store.search('ཆོས', lang='bo')] == [3]
+        assert store.search('ཆོས', lang='zh') == []
+
+        out_files = store.export_docx('Toh0198_kp0016_大乘經', tmp_path / 'out')
+        assert [f.name for f in out_files] == ['Toh0198_kp0016_大乘經_bo.docx', 'Toh0198_kp0016_大乘經_zh.docx']
+
+
+def test_dry_run_lists_the_works_missing_from_the_store(tmp_path):
+    from pecha_preparation_components.raw_input_parsers.parse_cbeta_xml_triplets import parse_cbeta_xml_triplets
+
+    work = tmp_path / 'in' / 'Toh0198_kp0016_大乘經'
+    work.mkdir(parents=True)
+    (work / 'a.bo.xml').write_text('<text><s id="1">ཀ།</s></text>', encoding='utf-8')
+    (work / 'a.zh.xml').write_text('<text><s id="1">一</s></text>', encoding='utf-8')
+    (work / 'a.bo.zh.xml').write_text('<linkGrp><link xtargets="1;1"/></linkGrp>', encoding='utf-8')
+    out, db = tmp_path / 'out', tmp_path / 'segments.db'
+
+    def rebuilt(store_file, dry_run):
+        return [r['work'] for r in parse_cbeta_xml_triplets(tmp_path / 'in', out, dry_run=dry_run, fast_docx=True,
+                                                            store_file=store_file)]
+
+    assert rebuilt(None, False) == ['Toh0198_kp0016_大乘經']
+    # up to date, but missing from a new store
+    assert rebuilt(db, True) == ['Toh0198_kp0016_大乘經']
+    assert not db.exists()
+    assert rebuilt(db, False) == ['Toh0198_kp0016_大乘經']
+    assert rebuilt(db, True) == []
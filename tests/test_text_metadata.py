@@ -0,0 +1,56 @@
+from openpyxl import Workbook
+
+from pecha_preparation_components.catalog_parser import catalog_manager
+from pecha_preparation_components.catalog_parser.catalog_manager import parse_text_metadata
+
+
+def write_metadata(path, title):
+    wb = Workbook()
+    sheet = wb.active
+    sheet.title = 'root text'
+    sheet.append([None, 'BO', 'EN', 'ZH'])
+    sheet.append(['author', 'སངས་རྒྱས་ཤཀྱ་ཐུབ་པ།', 'Buddha Shakyamuni', None])
+    sheet.append(['title_short', title, 'The Sutra', '聖三歸依'])
+    wb.save(path)
+
+
+def test_parse_text_metadata(tmp_path, monkeypatch):
+    write_metadata(tmp_path / 'a.xlsx', 'འཕགས་པ་གསུམ་ལ་སྐྱབས་སུ་འགྲོ་བ།')
+    cache = tmp_path / 'cache' / 'metadata.pickle'
+
+    texts = parse_text_metadata(tmp_path, cache_path=cache)
+    meta = texts['འཕགས་པ་གསུམ་ལ་སྐྱབས་སུ་འགྲོ་བ།']
+    assert meta['other']['type'] == 'root_text'
+    assert meta['author'] == {'BO': 'སངས་རྒྱས་ཤཀྱ་ཐུབ་པ།', 'EN': 'Buddha Shakyamuni', 'ZH': None}
+    assert cache.is_file()
+
+    # unchanged workbooks are not opened again, and the cache is not rewritten
+    def fail(f):
+        raise AssertionError(f'{f} should come from the cache')
+    monkeypatch.setattr(catalog_manager, 'parse_metadata_file', fail)
+    saved = cache.stat()
+    assert parse_text_metadata(tmp_path, cache_path=cache) == texts
+    assert (cache.stat().st_ino, cache.stat().st_mtime_ns) == (saved.st_ino, saved.st_mtime_ns)
+
+    # modified workbooks are parsed again
+    monkeypatch.undo()
+    write_metadata(tmp_path / 'a.xlsx', 'གསུམ་ལ་སྐྱབས་སུ་འགྲོ་བའི་མདོ།')
+    assert list(parse_text_metadata(tmp_path, cache_path=cache)) == ['གསུམ་ལ་སྐྱབས་སུ་འགྲོ་བའི་མདོ།']
+
+
+def test_read_sheet_stops_after_the_last_used_row(tmp_path):
+    from itertools import chain, repeat
+
+    class Sheet:
+        # a sheet claiming a million rows, the empty ones after the data being read lazily
+        def __init__(self):
+            self.rows = chain([(None, 'BO'), ('author', 'ཀ'), (None, None), ('title_short', 'ཁ', 'x')],
+                              repeat((None, None), 10 ** 6))
+
+        def iter_rows(self, values_only):
+            return self.rows
+
+    sheet = Sheet()
+    assert catalog_manager.read_sheet(sheet) == [[None, 'BO'], ['author', 'ཀ'], [None, None],
+                                                 ['title_short', 'ཁ', 'x']]
+    assert len(list(sheet.rows)) < 10 ** 6
@@ -0,0 +1,43 @@
+from pecha_preparation_components.raw_input_parsers import xml_reader
+from pecha_preparation_components.raw_input_parsers.xml_reader import (read_links, read_sentences, stream_links,
+                                                                       stream_sentences)
+
+
+def test_read_sentences_as_expat(tmp_path):
+    f = tmp_path / 'a.bo.xml'
+    f.write_bytes('<?xml version="1.0" encoding="utf-8"?>\r\n<text><p id="1">\r\n'
+                  '<s id="1:1">ཀ། </s><s id=\'1:2\'/><s id="1:3">a &lt;26b&gt; &#3904;\r\nb</s>'
+                  '<s id="1:4"></s></p></text>'.encode('utf-8'))
+    assert read_sentences(f) == list(stream_sentences(f)) == [
+        ('1:1', 'ཀ། '), ('1:2', ''), ('1:3', 'a <26b> ཀ\nb'), ('1:4', '')]
+
+    # markup inside a sentence is left to expat
+    f.write_text('<text><s id="1:1">a<b>b</b></s><!-- <s id="x">c</s> --></text>', encoding='utf-8')
+    assert read_sentences(f) is None
+    assert list(xml_reader.iter_sentences(f)) == [('1:1', 'ab')]
+
+
+def test_read_links_as_expat(tmp_path, monkeypatch):
+    f = tmp_path / 'a.bo.zh.xml'
+    links = [
+        "<linkGrp toDoc='a.zh.xml' fromDoc='a.bo.xml'>",
+        "<link type='1-1' xtargets='1:1;1:1' status='man'/>",
+        "<link type='2-1' xtargets='2:1 2:2;2:1' status='man'/>",
+        "<link type='0-1' xtargets=';3:1' status='man'/></linkGrp>",
+    ]
+    f.write_text('\n'.join(links), encoding='utf-8')
+    expected = [('1-1', ('1:1',), ('1:1',)), ('2-1', ('2:1', '2:2'), ('2:1',)), ('0-1', (), ('3:1',))]
+    assert read_links(f) == list(stream_links(f)) == expected
+
+    # other attribute orders and quotes
+    f.write_text('<linkGrp><link status="man" type="1-1" xtargets="1:1;1:1"/>'
+                 '<link xtargets=\'2:1 2:2;2:1\' type=\'2-1\'/><link type="0-1" xtargets=";3:1"/></linkGrp>')
+    assert read_links(f) == list(stream_links(f)) == expected
+    # a ">" in a value
+    f.write_text('<linkGrp><link note="a > b" type="1-1" xtargets="1:1;1:1"/></linkGrp>')
+    assert read_links(f) == list(stream_links(f)) == expected[:1]
+
+    # larger files are streamed
+    monkeypatch.setattr(xml_reader, 'MAX_IN_MEMORY', 10)
+    assert read_links(f) is None
+    assert list(xml_reader.iter_links(f)) == expected[:1]
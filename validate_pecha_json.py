@@ -0,0 +1,27 @@
+from pathlib import Path
+import argparse
+
+from pecha_preparation_components import instrumentation
+from pecha_preparation_components.tools import validate_tree
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='check pecha.org json files against the templates of docs/sample_files')
+    parser.add_argument('folder', type=Path, nargs='?', default=Path('output/Gold Standard'))
+    parser.add_argument('--catalog', type=Path, help='catalog.json from parse_catalog.py, to also check the categories')
+    parser.add_argument('--pattern', default='*.json')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--quiet', action='store_true', help='only list the files that have errors')
+    parser.add_argument('--report', type=Path, help='write a json report of the time spent in each stage')
+    args = parser.parse_args()
+    if args.report:
+        instrumentation.enable()
+
+    results = validate_tree(args.folder, catalog_file=args.catalog, pattern=args.pattern, workers=args.workers,
+                            quiet=args.quiet)
+
+    if args.report:
+        instrumentation.save_report(args.report)
+    if any(r['errors'] for r in results):
+        raise SystemExit(1)